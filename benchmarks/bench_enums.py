@@ -0,0 +1,120 @@
+# Compares the memory held by JobEvent objects built with from_dict from a synthetic event stream,
+# without enum converters and with --enum-converters intern and enum, on a schema inferred with
+# --detect-enums. Most string fields of the events (Type, State, TenantId, MachineName, ...) have a
+# handful of distinct values; keys, ids and timestamps are unique.
+#
+#   python benchmarks/bench_enums.py [--documents N] [--max-values N] [--slots]
+
+import argparse
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import make  # noqa: E402
+from jschema_to_python_2 import api, json_backend  # noqa: E402
+from jschema_to_python_2.to_json import to_json  # noqa: E402
+
+ROOT_CLASS_NAME = 'JobEvent'
+
+
+def make_event(index, machines, releases, rng):
+    machine = rng.randrange(len(machines))
+    process, release = rng.choice(releases)
+    robot_type = rng.choice(['Unattended', 'Attended', 'NonProduction', 'Development'])
+    return {
+        'Type': rng.choice(['job.created', 'job.started', 'job.completed', 'job.faulted', 'job.stopped']),
+        'EventId': str(78936220 + index),
+        'Timestamp': f'2023-05-{1 + index % 28:02d}T06:04:{index % 60:02d}.{rng.randrange(10 ** 7):07d}Z',
+        'Jobs': {
+            'Id': 24704204 + index,
+            'Key': str(uuid.UUID(int=rng.getrandbits(128))),
+            'State': rng.choice(['Pending', 'Running', 'Successful', 'Faulted', 'Stopped']),
+            'Source': rng.choice(['Manual', 'Schedule', 'Queue']),
+            'ReleaseName': release,
+            'Type': robot_type,
+            'Robot': {
+                'Id': machine,
+                'MachineName': machines[machine],
+                'Version': rng.choice(['18.3', '21.10', '22.4']),
+                'Type': robot_type,
+                'HostingType': rng.choice(['Standard', 'Floating']),
+            },
+            'Release': {'ProcessKey': process, 'Name': release},
+            'Info': rng.choice([None, 'Job completed', 'Job stopped by user']),
+        },
+        'TenantId': rng.choice(['tenant-default', 'tenant-eu', 'tenant-us']),
+    }
+
+
+def write_events(directory, documents, rng):
+    machines = [f'machine-{rng.randrange(16 ** 8):08x}' for _ in range(40)]
+    releases = [(f'Process{i}', f'Process{i}_all') for i in range(30)]
+    events_file = Path(directory) / 'events.jsonl'
+    with open(events_file, 'w') as f:
+        for index in range(documents):
+            f.write(json.dumps(make_event(index, machines, releases, rng)) + '\n')
+    return events_file
+
+
+def measure(module, lines):
+    # the memory still held once the objects are built and the parsed documents are gone
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    objects = [module.JobEvent.from_dict(json_backend.loads(line)) for line in lines]
+    elapsed = time.perf_counter() - start_time
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objects, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory held by objects built with and without enum converters.")
+    parser.add_argument("--documents", help="Number of events", type=int, default=100000)
+    parser.add_argument("--max-values", help="--detect-enums threshold", type=int, default=50)
+    parser.add_argument("--slots", help="Generate slotted classes", action="store_true")
+    parser.add_argument("--seed", help="Random seed of the synthetic data", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        events_file = write_events(directory, args.documents, rng)
+        make.set_inference_options(None, args.max_values)
+        schema = make.build_schema([events_file], logging.getLogger('bench_enums'))
+        with open(events_file, 'rb') as f:
+            lines = f.readlines()
+    enums = make.merge_nullable_enums(schema)
+    schema['title'] = ROOT_CLASS_NAME
+    schema = make.refactor_inner_classes(schema)
+    print(f'{args.documents} events, {enums} string properties marked as enums')
+
+    results = {}
+    expected = None
+    for enum_converters in (None, 'intern', 'enum'):
+        module = api.load_module(schema, ROOT_CLASS_NAME, slots=args.slots, enum_converters=enum_converters)
+        objects, held, elapsed = measure(module, lines)
+        # the converted objects serialize to the same JSON
+        sample = [to_json(obj) for obj in objects[:1000]]
+        if expected is None:
+            expected = sample
+        elif sample != expected:
+            sys.exit(f'--enum-converters {enum_converters} changes the JSON of the objects')
+        name = enum_converters or 'none'
+        results[name] = held
+        print(f'{name:>6}: {held / 2 ** 20:7.1f} MB held, {held / args.documents:5.0f} bytes/event, '
+              f'from_dict {args.documents / elapsed:,.0f} events/sec')
+        del objects
+
+    for name in ('intern', 'enum'):
+        print(f'{name} holds {100 * (1 - results[name] / results["none"]):.0f}% less memory than none')
+
+
+if __name__ == '__main__':
+    main()
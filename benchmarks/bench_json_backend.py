@@ -0,0 +1,88 @@
+# Compares the selected JSON backend against the standard library (and jsonpickle,
+# which used to load schemas) on a large synthetic schema and corpus.
+#
+#   python benchmarks/bench_json_backend.py [--definitions N] [--records N]
+
+import argparse
+import json
+import random
+import sys
+import time
+import warnings
+from pathlib import Path
+
+import jsonpickle
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from jschema_to_python_2 import json_backend  # noqa: E402
+
+SCALARS = ['string', 'integer', 'number', 'boolean']
+
+
+def make_schema(definitions, width, rng):
+    defs = {}
+    for i in range(definitions):
+        properties = {f'Field{j}': {'type': rng.choice(SCALARS)} for j in range(width)}
+        if i:
+            properties['Parent'] = {'$ref': f'#/$defs/Def{rng.randrange(i)}'}
+        defs[f'Def{i}'] = {'type': 'object', 'properties': properties, 'required': sorted(properties)}
+    return {
+        '$schema': 'http://json-schema.org/schema#',
+        'type': 'object',
+        'title': 'Root',
+        'properties': {'Def0': {'$ref': '#/$defs/Def0'}},
+        '$defs': defs,
+    }
+
+
+def make_record(width, rng):
+    record = {f'Field{j}': rng.choice(['value', 12345, 1.5, True, None]) for j in range(width)}
+    record['Nested'] = {f'Inner{j}': rng.choice(['x', 1, 2.5]) for j in range(width // 2)}
+    record['Items'] = [rng.randrange(1000) for _ in range(5)]
+    return record
+
+
+def timed(function, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def report(label, baseline_name, baseline, backend):
+    print(f'{label}: {baseline_name} {baseline:.3f}s, {json_backend.BACKEND} {backend:.3f}s ({baseline / backend:.1f}x)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON backends on a synthetic schema and corpus.")
+    parser.add_argument("--definitions", help="Number of $defs in the schema", type=int, default=5000)
+    parser.add_argument("--records", help="Number of corpus records", type=int, default=100000)
+    parser.add_argument("--width", help="Properties per object", type=int, default=20)
+    args = parser.parse_args()
+
+    # jsonpickle warns about an upcoming change in how it decodes dict keys
+    warnings.simplefilter('ignore', DeprecationWarning)
+
+    rng = random.Random(0)
+    schema_text = json.dumps(make_schema(args.definitions, args.width, rng), indent=2)
+    lines = [json.dumps(make_record(args.width, rng)).encode('utf-8') for _ in range(args.records)]
+    records = [json.loads(line) for line in lines]
+    print(f'Backend: {json_backend.BACKEND}; schema {len(schema_text) / 1e6:.1f} MB, '
+          f'corpus {sum(map(len, lines)) / 1e6:.1f} MB in {args.records} lines')
+
+    report('schema load', 'jsonpickle', timed(jsonpickle.decode, schema_text), timed(json_backend.loads, schema_text))
+    report('schema load', 'json', timed(json.loads, schema_text), timed(json_backend.loads, schema_text))
+    report('corpus parse', 'json',
+           timed(lambda: [json.loads(line) for line in lines]),
+           timed(lambda: [json_backend.loads(line) for line in lines]))
+    report('compact encode', 'json',
+           timed(lambda: [json.dumps(record, separators=(',', ':')) for record in records]),
+           timed(lambda: [json_backend.dumps(record) for record in records]))
+
+
+if __name__ == '__main__':
+    main()
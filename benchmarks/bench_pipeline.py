@@ -0,0 +1,242 @@
+# Times every stage of the pipeline on a synthetic corpus and schema, and writes the
+# results as JSON so that runs can be compared.
+#
+#   python benchmarks/bench_pipeline.py [--documents N] [--width N] [--depth N]
+#                                       [--definitions N] [--output FILE] [--compare FILE]
+#
+# Stages: schema inference (make.build_schema), refactor_inner_classes, code generation
+# (ObjectModelModuleGenerator.generate, for the inferred schema and for a schema with
+# --definitions $defs), import of the generated module, construction with from_dict, into a
+# --batch-classes container (whose rows are checked against the from_dict objects) and with
+# **kwargs, and to_json.
+
+import argparse
+import copy
+import importlib
+import json
+import logging
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_DIR = Path(__file__).parent.parent
+
+sys.path.insert(0, str(REPO_DIR))
+
+import make  # noqa: E402
+from jschema_to_python_2 import json_backend  # noqa: E402
+from jschema_to_python_2.object_model_module_generator import ObjectModelModuleGenerator  # noqa: E402
+from jschema_to_python_2.to_json import to_json  # noqa: E402
+
+SCALAR_VALUES = {
+    'string': lambda rng: rng.choice(['alpha', 'beta', 'gamma', 'delta']),
+    'integer': lambda rng: rng.randrange(1000000),
+    # JSON numbers without a fraction are parsed as ints
+    'number': lambda rng: rng.random() * 1000 if rng.random() < 0.9 else rng.randrange(1000),
+    'boolean': lambda rng: rng.random() < 0.5,
+}
+SCALARS = sorted(SCALAR_VALUES)
+
+MODULE_NAME = 'benchpipeline'
+ROOT_CLASS_NAME = 'Root'
+
+# a stage slower than the baseline by more than this fraction is reported as a regression
+DEFAULT_THRESHOLD = 0.10
+
+
+def make_object(width, depth, level, rng):
+    # every field keeps one type, so the inferred schema has no unions; one in ten optional
+    # fields, and some of the arrays, are left out to exercise defaults
+    obj = {}
+    for j in range(width):
+        if j % 10 == 9 and rng.random() < 0.5:
+            continue
+        obj[f'Field{j}'] = SCALAR_VALUES[SCALARS[j % len(SCALARS)]](rng)
+    if rng.random() < 0.9:
+        obj['Tags'] = [rng.choice(['a', 'b', 'c']) for _ in range(rng.randrange(4))]
+    if level < depth:
+        # nested objects are collected into $defs by property name, which must be unique
+        obj[f'Level{level + 1}'] = make_object(max(1, width // 2), depth, level + 1, rng)
+    return obj
+
+
+def write_corpus(directory, documents, width, depth, rng):
+    corpus_file = Path(directory) / 'corpus.jsonl'
+    with open(corpus_file, 'w') as f:
+        for _ in range(documents):
+            f.write(json.dumps(make_object(width, depth, 0, rng)) + '\n')
+    return corpus_file
+
+
+def make_schema(definitions, width, rng):
+    defs = {}
+    for i in range(definitions):
+        properties = {f'Field{j}': {'type': rng.choice(SCALARS)} for j in range(width)}
+        if i:
+            properties['Parent'] = {'$ref': f'#/$defs/Def{rng.randrange(i)}'}
+        defs[f'Def{i}'] = {'type': 'object', 'properties': properties, 'required': sorted(properties)}
+    return {
+        '$schema': 'http://json-schema.org/schema#',
+        'type': 'object',
+        'title': ROOT_CLASS_NAME,
+        'properties': {'Def0': {'$ref': '#/$defs/Def0'}},
+        '$defs': defs,
+    }
+
+
+def generate_module(schema, directory, module_name, batch_classes=False):
+    schema_file = Path(directory) / f'{module_name}-schema.json'
+    with open(schema_file, 'w') as f:
+        f.write(json.dumps(schema, indent=2))
+
+    class Args:
+        def __init__(self):
+            self.output_directory = str(Path(directory) / module_name)
+            self.force = True
+            self.module_name = module_name
+            self.schema_path = str(schema_file)
+            self.hints_file_path = None
+            self.root_class_name = ROOT_CLASS_NAME
+            self.slots = False
+            self.frozen = False
+            self.batch_classes = batch_classes
+            self.lazy = False
+            self.validators = False
+            self.split_modules = False
+            self.enum_converters = None
+
+    ObjectModelModuleGenerator(Args()).generate()
+
+
+def import_module(module_name):
+    for name in list(sys.modules):
+        if name == module_name or name.startswith(module_name + '.'):
+            del sys.modules[name]
+    importlib.invalidate_caches()
+    return importlib.import_module(module_name)
+
+
+def run_stage(stages, name, function, items, repeat):
+    # keeps the best of repeat runs, and returns the result of the last one
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    stages[name] = {
+        'seconds': round(best, 6),
+        'items': items,
+        'items_per_second': round(items / best, 1) if best else None,
+    }
+    print(f'{name:>24}: {best:.3f}s for {items} items')
+    return result
+
+
+def compare(results, baseline_file, threshold):
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    if baseline.get('parameters') != results['parameters']:
+        print(f'Warning: {baseline_file} was run with different parameters')
+
+    regressions = []
+    for name, stage in results['stages'].items():
+        baseline_stage = baseline.get('stages', {}).get(name)
+        if not baseline_stage or not baseline_stage['seconds']:
+            continue
+        ratio = stage['seconds'] / baseline_stage['seconds']
+        marker = ''
+        if ratio > 1 + threshold:
+            marker = '  REGRESSION'
+            regressions.append(name)
+        print(f'{name:>24}: {ratio:.2f}x the baseline time{marker}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of the pipeline on a synthetic corpus and schema.")
+    parser.add_argument("--documents", help="Number of corpus documents", type=int, default=20000)
+    parser.add_argument("--width", help="Properties per top-level object (halved at each nesting level)", type=int, default=20)
+    parser.add_argument("--depth", help="Nesting depth of the corpus documents", type=int, default=3)
+    parser.add_argument("--definitions", help="Number of $defs in the synthetic schema used for the generation stage", type=int, default=2000)
+    parser.add_argument("--repeat", help="Runs per stage; the best time is kept", type=int, default=3)
+    parser.add_argument("--seed", help="Random seed of the synthetic data", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare the results against those of an earlier run (a JSON file written by --output)")
+    parser.add_argument("--threshold", help="Slowdown, as a fraction, reported as a regression by --compare", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    logger = logging.getLogger('bench_pipeline')
+    rng = random.Random(args.seed)
+    stages = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        sys.path.insert(0, directory)
+        corpus_file = write_corpus(directory, args.documents, args.width, args.depth, rng)
+
+        schema = run_stage(stages, 'inference', lambda: make.build_schema([corpus_file], logger), args.documents, args.repeat)
+        schema['title'] = ROOT_CLASS_NAME
+        schema = run_stage(
+            stages, 'refactor_inner_classes', lambda: make.refactor_inner_classes(copy.deepcopy(schema)), 1, args.repeat
+        )
+        class_count = 1 + len(schema.get('$defs', {}))
+        run_stage(stages, 'generate', lambda: generate_module(schema, directory, MODULE_NAME), class_count, args.repeat)
+        if args.definitions:
+            synthetic_schema = make_schema(args.definitions, args.width, rng)
+            run_stage(
+                stages, 'generate_definitions',
+                lambda: generate_module(synthetic_schema, directory, MODULE_NAME + '_defs'),
+                args.definitions + 1, args.repeat,
+            )
+        module = run_stage(stages, 'import', lambda: import_module(MODULE_NAME), class_count, args.repeat)
+        root_class = getattr(module, ROOT_CLASS_NAME)
+
+        with open(corpus_file, 'rb') as f:
+            records = [json_backend.loads(line) for line in f]
+        objects = run_stage(
+            stages, 'from_dict', lambda: [root_class.from_dict(record) for record in records], len(records), args.repeat
+        )
+        # the rows of a --batch-classes container come back as from_dict builds them
+        generate_module(schema, directory, MODULE_NAME + '_batch', batch_classes=True)
+        batch_class = getattr(import_module(MODULE_NAME + '_batch'), ROOT_CLASS_NAME + 'Batch')
+        batch = run_stage(stages, 'batch', lambda: batch_class.from_dicts(records), len(records), args.repeat)
+        if list(batch) != [batch_class.record_class.from_dict(record) for record in records]:
+            sys.exit('the rows of the batch differ from the objects built by from_dict')
+        # nested objects stay dicts here, as they would with Root(**json.loads(line))
+        run_stage(stages, 'kwargs', lambda: [root_class(**record) for record in records], len(records), args.repeat)
+        run_stage(stages, 'to_json', lambda: [to_json(obj) for obj in objects], len(objects), args.repeat)
+
+    results = {
+        'parameters': {
+            'documents': args.documents,
+            'width': args.width,
+            'depth': args.depth,
+            'definitions': args.definitions,
+            'seed': args.seed,
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'json_backend': json_backend.BACKEND,
+        },
+        'stages': stages,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(json.dumps(results, indent=2))
+        print(f'Results written to {args.output}')
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} stage(s) regressed by more than {args.threshold:.0%}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# Measures to_json throughput on the example JobEvent model.
+#
+#   python benchmarks/bench_to_json.py [-n COUNT] [--slots]
+
+import argparse
+import importlib
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent
+REPO_DIR = SCRIPT_DIR.parent
+EXAMPLES_DIR = REPO_DIR / 'examples'
+
+sys.path.insert(0, str(REPO_DIR))
+
+from jschema_to_python_2.object_model_module_generator import ObjectModelModuleGenerator  # noqa: E402
+from jschema_to_python_2.to_json import to_json  # noqa: E402
+
+
+def generate_module(output_dir, slots):
+    class Args:
+        def __init__(self):
+            self.output_directory = str(Path(output_dir) / 'benchevents')
+            self.force = True
+            self.module_name = 'benchevents'
+            self.schema_path = str(EXAMPLES_DIR / 'jobevent-schema.json')
+            self.hints_file_path = None
+            self.root_class_name = 'JobEvent'
+            self.slots = slots
+            self.frozen = False
+            self.batch_classes = False
+            self.lazy = False
+            self.validators = False
+            self.split_modules = False
+            self.enum_converters = None
+
+    ObjectModelModuleGenerator(Args()).generate()
+    sys.path.insert(0, str(output_dir))
+    return importlib.import_module('benchevents._job_event')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure to_json throughput on the example JobEvent model.")
+    parser.add_argument("-n", "--count", help="Number of objects to serialize", type=int, default=20000)
+    parser.add_argument("--slots", help="Generate slotted classes", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        module = generate_module(output_dir, args.slots)
+        with open(EXAMPLES_DIR / 'job.created.json') as f:
+            event = module.JobEvent.from_dict(json.load(f))
+
+        objects = [event] * args.count
+        start_time = time.perf_counter()
+        for obj in objects:
+            to_json(obj)
+        elapsed = time.perf_counter() - start_time
+
+    print(f'to_json: {args.count} objects in {elapsed:.2f}s ({args.count / elapsed:.0f} objects/sec)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# Compares the validate methods generated with --validators against interpreting the same
+# schema at runtime: a minimal interpreter of the keywords they check (type, required,
+# properties, items and $ref), and the jsonschema package when it is installed.
+#
+#   python benchmarks/bench_validators.py [--documents N] [--width N] [--depth N]
+
+import argparse
+import copy
+import json
+import logging
+import random
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import make  # noqa: E402
+from bench_pipeline import write_corpus  # noqa: E402
+from jschema_to_python_2 import api  # noqa: E402
+from jschema_to_python_2.validation import ValidationError  # noqa: E402
+
+ROOT_CLASS_NAME = 'Root'
+
+TYPE_CHECKS = {
+    'string': lambda value: type(value) is str,
+    'integer': lambda value: type(value) is int or (type(value) is float and value.is_integer()),
+    'number': lambda value: type(value) is int or type(value) is float,
+    'boolean': lambda value: type(value) is bool,
+    'null': lambda value: value is None,
+    'array': lambda value: type(value) is list,
+    'object': lambda value: type(value) is dict,
+}
+
+
+def interpret(schema, definitions, value, path='$'):
+    # walks the schema for every value, as a generic validator does
+    ref = schema.get('$ref')
+    if ref:
+        return interpret(definitions[ref.rsplit('/', 1)[-1]], definitions, value, path)
+    type_names = schema.get('type')
+    if type_names:
+        if isinstance(type_names, str):
+            type_names = [type_names]
+        if not any(TYPE_CHECKS[type_name](value) for type_name in type_names):
+            raise ValidationError(path, 'expected ' + ' or '.join(type_names))
+    if type(value) is dict:
+        for name in schema.get('required', ()):
+            if name not in value:
+                raise ValidationError(path, f'missing required property "{name}"')
+        for name, property_schema in schema.get('properties', {}).items():
+            if name in value:
+                interpret(property_schema, definitions, value[name], path + '.' + name)
+    elif type(value) is list and isinstance(schema.get('items'), dict):
+        for index, item in enumerate(value):
+            interpret(schema['items'], definitions, item, f'{path}[{index}]')
+
+
+def make_invalid_records(records, rng):
+    # one value per record, possibly in a nested object, is given the wrong type
+    invalid = []
+    for record in records[:100]:
+        record = copy.deepcopy(record)
+        target = record
+        while rng.random() < 0.5 and any(isinstance(value, dict) for value in target.values()):
+            target = next(value for value in target.values() if isinstance(value, dict))
+        key = rng.choice(sorted(target))
+        target[key] = [] if not isinstance(target[key], list) else 'not an array'
+        invalid.append(record)
+    return invalid
+
+
+def time_validator(name, validate, records, repeat):
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for record in records:
+            validate(record)
+        elapsed = time.perf_counter() - start_time
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{name:>24}: {best:.3f}s, {len(records) / best:,.0f} documents/sec')
+    return best
+
+
+def is_valid(validate, record):
+    try:
+        validate(record)
+    except Exception:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the generated validators against runtime schema interpretation.")
+    parser.add_argument("--documents", help="Number of corpus documents", type=int, default=20000)
+    parser.add_argument("--width", help="Properties per top-level object (halved at each nesting level)", type=int, default=20)
+    parser.add_argument("--depth", help="Nesting depth of the corpus documents", type=int, default=3)
+    parser.add_argument("--repeat", help="Runs per validator; the best time is kept", type=int, default=3)
+    parser.add_argument("--seed", help="Random seed of the synthetic data", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        corpus_file = write_corpus(directory, args.documents, args.width, args.depth, rng)
+        schema = make.build_schema([corpus_file], logging.getLogger('bench_validators'))
+        with open(corpus_file) as f:
+            records = [json.loads(line) for line in f]
+    schema['title'] = ROOT_CLASS_NAME
+    schema = make.refactor_inner_classes(schema)
+
+    module = api.load_module(schema, ROOT_CLASS_NAME, validators=True)
+    validators = {
+        'generated': module.Root.validate,
+        'interpreted': lambda record: interpret(schema, schema['$defs'], record),
+    }
+    try:
+        import jsonschema
+    except ImportError:
+        print('jsonschema is not installed, skipping it')
+    else:
+        with warnings.catch_warnings():
+            # genson's "$schema" is not a known draft, so the latest one is used
+            warnings.simplefilter('ignore', DeprecationWarning)
+            validators['jsonschema'] = jsonschema.validators.validator_for(schema)(schema).validate
+
+    # records without one of the optional arrays or objects, which are still valid
+    required = set(schema.get('required', ()))
+    optional_records = [
+        {key: value for key, value in records[0].items() if key != name}
+        for name, property_schema in schema['properties'].items()
+        if property_schema.get('type') in ('array', 'object') and name not in required
+    ]
+    if not optional_records:
+        sys.exit('the corpus has no optional array or object property')
+
+    invalid_records = make_invalid_records(records, rng)
+    for name, validate in validators.items():
+        if not all(is_valid(validate, record) for record in records + optional_records):
+            sys.exit(f'{name} rejects a valid record')
+        valid_count = sum(is_valid(validate, record) for record in invalid_records)
+        if valid_count:
+            sys.exit(f'{name} accepts {valid_count} of the invalid records')
+
+    times = {name: time_validator(name, validate, records, args.repeat) for name, validate in validators.items()}
+    for name, seconds in times.items():
+        if name != 'generated':
+            print(f'generated validators are {seconds / times["generated"]:.1f}x faster than {name}')
+
+
+if __name__ == '__main__':
+    main()
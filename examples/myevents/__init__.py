@@ -1,3 +1,10 @@
 # This file was generated by jschema_to_python_2 - lkekana version.
 
 from myevents._job_event import JobEvent
+from myevents._job_event import Job
+from myevents._job_event import Jobs
+from myevents._job_event import JobsRelease
+from myevents._job_event import JobsRobot
+from myevents._job_event import Release
+from myevents._job_event import Robot
+from myevents._job_event import StartInfo
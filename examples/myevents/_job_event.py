@@ -1,6 +1,7 @@
 # This file was generated by jschema_to_python_2 - lkekana version.
 
 import attr
+import json
 
 
 @attr.s
@@ -15,29 +16,63 @@ class JobEvent(object):
     StartInfo = attr.ib(default=None, metadata={"schema_property_name": "StartInfo"})
     UserId = attr.ib(default=None, metadata={"schema_property_name": "UserId"})
 
+    @classmethod
+    def from_dict(cls, d):
+        value_Job = d.get("Job")
+        value_Jobs = d.get("Jobs")
+        value_StartInfo = d.get("StartInfo")
+        return cls(
+            EventId=d["EventId"],
+            TenantId=d["TenantId"],
+            Timestamp=d["Timestamp"],
+            Type=d["Type"],
+            Job=None if value_Job is None else Job.from_dict(value_Job),
+            Jobs=None if value_Jobs is None else Jobs.from_dict(value_Jobs),
+            OrganizationUnitId=d.get("OrganizationUnitId", None),
+            StartInfo=None if value_StartInfo is None else StartInfo.from_dict(value_StartInfo),
+            UserId=d.get("UserId", None),
+        )
+
+    @classmethod
+    def from_json(cls, s):
+        return cls.from_dict(json.loads(s))
+
 
 @attr.s
 class Robot(object):
-    Description = attr.ib(metadata={"schema_property_name": "Description"})
-    HostingType = attr.ib(metadata={"schema_property_name": "HostingType"})
     Id = attr.ib(metadata={"schema_property_name": "Id"})
-    MachineId = attr.ib(metadata={"schema_property_name": "MachineId"})
     MachineName = attr.ib(metadata={"schema_property_name": "MachineName"})
     Name = attr.ib(metadata={"schema_property_name": "Name"})
-    Type = attr.ib(metadata={"schema_property_name": "Type"})
-    UserName = attr.ib(metadata={"schema_property_name": "UserName"})
-    Version = attr.ib(metadata={"schema_property_name": "Version"})
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            Id=d["Id"],
+            MachineName=d["MachineName"],
+            Name=d["Name"],
+        )
+
+    @classmethod
+    def from_json(cls, s):
+        return cls.from_dict(json.loads(s))
 
 @attr.s
 class Release(object):
-    Description = attr.ib(metadata={"schema_property_name": "Description"})
     Id = attr.ib(metadata={"schema_property_name": "Id"})
-    InputArguments = attr.ib(metadata={"schema_property_name": "InputArguments"})
-    IsLatestVersion = attr.ib(metadata={"schema_property_name": "IsLatestVersion"})
     Key = attr.ib(metadata={"schema_property_name": "Key"})
-    Name = attr.ib(metadata={"schema_property_name": "Name"})
     ProcessKey = attr.ib(metadata={"schema_property_name": "ProcessKey"})
-    ProcessVersion = attr.ib(metadata={"schema_property_name": "ProcessVersion"})
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            Id=d["Id"],
+            Key=d["Key"],
+            ProcessKey=d["ProcessKey"],
+        )
+
+    @classmethod
+    def from_json(cls, s):
+        return cls.from_dict(json.loads(s))
 
 @attr.s
 class Job(object):
@@ -50,6 +85,23 @@ class Job(object):
     StartTime = attr.ib(metadata={"schema_property_name": "StartTime"})
     State = attr.ib(metadata={"schema_property_name": "State"})
 
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            Id=d["Id"],
+            Info=d["Info"],
+            Key=d["Key"],
+            OutputArguments=d["OutputArguments"],
+            Release=Release.from_dict(d["Release"]),
+            Robot=Robot.from_dict(d["Robot"]),
+            StartTime=d["StartTime"],
+            State=d["State"],
+        )
+
+    @classmethod
+    def from_json(cls, s):
+        return cls.from_dict(json.loads(s))
+
 @attr.s
 class StartInfo(object):
     JobsCount = attr.ib(metadata={"schema_property_name": "JobsCount"})
@@ -58,6 +110,78 @@ class StartInfo(object):
     Strategy = attr.ib(metadata={"schema_property_name": "Strategy"})
     RobotIds = attr.ib(factory=list, metadata={"schema_property_name": "RobotIds"})
 
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            JobsCount=d["JobsCount"],
+            ReleaseKey=d["ReleaseKey"],
+            Source=d["Source"],
+            Strategy=d["Strategy"],
+            RobotIds=d.get("RobotIds") or [],
+        )
+
+    @classmethod
+    def from_json(cls, s):
+        return cls.from_dict(json.loads(s))
+
+@attr.s
+class JobsRobot(object):
+    Description = attr.ib(metadata={"schema_property_name": "Description"})
+    HostingType = attr.ib(metadata={"schema_property_name": "HostingType"})
+    Id = attr.ib(metadata={"schema_property_name": "Id"})
+    MachineId = attr.ib(metadata={"schema_property_name": "MachineId"})
+    MachineName = attr.ib(metadata={"schema_property_name": "MachineName"})
+    Name = attr.ib(metadata={"schema_property_name": "Name"})
+    Type = attr.ib(metadata={"schema_property_name": "Type"})
+    UserName = attr.ib(metadata={"schema_property_name": "UserName"})
+    Version = attr.ib(metadata={"schema_property_name": "Version"})
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            Description=d["Description"],
+            HostingType=d["HostingType"],
+            Id=d["Id"],
+            MachineId=d["MachineId"],
+            MachineName=d["MachineName"],
+            Name=d["Name"],
+            Type=d["Type"],
+            UserName=d["UserName"],
+            Version=d["Version"],
+        )
+
+    @classmethod
+    def from_json(cls, s):
+        return cls.from_dict(json.loads(s))
+
+@attr.s
+class JobsRelease(object):
+    Description = attr.ib(metadata={"schema_property_name": "Description"})
+    Id = attr.ib(metadata={"schema_property_name": "Id"})
+    InputArguments = attr.ib(metadata={"schema_property_name": "InputArguments"})
+    IsLatestVersion = attr.ib(metadata={"schema_property_name": "IsLatestVersion"})
+    Key = attr.ib(metadata={"schema_property_name": "Key"})
+    Name = attr.ib(metadata={"schema_property_name": "Name"})
+    ProcessKey = attr.ib(metadata={"schema_property_name": "ProcessKey"})
+    ProcessVersion = attr.ib(metadata={"schema_property_name": "ProcessVersion"})
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            Description=d["Description"],
+            Id=d["Id"],
+            InputArguments=d["InputArguments"],
+            IsLatestVersion=d["IsLatestVersion"],
+            Key=d["Key"],
+            Name=d["Name"],
+            ProcessKey=d["ProcessKey"],
+            ProcessVersion=d["ProcessVersion"],
+        )
+
+    @classmethod
+    def from_json(cls, s):
+        return cls.from_dict(json.loads(s))
+
 @attr.s
 class Jobs(object):
     BatchExecutionKey = attr.ib(metadata={"schema_property_name": "BatchExecutionKey"})
@@ -72,3 +196,24 @@ class Jobs(object):
     SourceType = attr.ib(metadata={"schema_property_name": "SourceType"})
     State = attr.ib(metadata={"schema_property_name": "State"})
     Type = attr.ib(metadata={"schema_property_name": "Type"})
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(
+            BatchExecutionKey=d["BatchExecutionKey"],
+            Id=d["Id"],
+            InputArguments=d["InputArguments"],
+            Key=d["Key"],
+            OutputArguments=d["OutputArguments"],
+            Release=JobsRelease.from_dict(d["Release"]),
+            ReleaseName=d["ReleaseName"],
+            Robot=JobsRobot.from_dict(d["Robot"]),
+            Source=d["Source"],
+            SourceType=d["SourceType"],
+            State=d["State"],
+            Type=d["Type"],
+        )
+
+    @classmethod
+    def from_json(cls, s):
+        return cls.from_dict(json.loads(s))
@@ -0,0 +1,84 @@
+import argparse
+import linecache
+import types
+
+import jschema_to_python_2.utilities as util
+from jschema_to_python_2.object_model_module_generator import ObjectModelModuleGenerator
+
+
+def generate_sources(
+    schema,
+    root_class_name,
+    module_name=None,
+    code_gen_hints=None,
+    slots=False,
+    frozen=False,
+    batch_classes=False,
+    lazy=False,
+    validators=False,
+    split_modules=False,
+    enum_converters=None,
+):
+    """Generates the source code of an object model module from a JSON schema.
+
+    :param schema: the JSON schema, as a dict.
+    :param root_class_name: the name of the class at the root of the object model.
+    :param module_name: the name of the module, used by the imports in __init__.py.
+    :param code_gen_hints: the code generation hints, as a dict.
+
+    The remaining parameters are the code generation options of the command
+    line (--slots, --frozen, --batch-classes, --lazy, --validators,
+    --split-modules and --enum-converters, which is "intern", "enum" or None).
+    Returns a dict of the generated sources by file name. Nothing is read
+    from or written to disk, and the schema is not modified.
+    """
+
+    args = argparse.Namespace(
+        output_directory="",
+        force=False,
+        module_name=module_name or root_class_name.lower(),
+        schema_path=None,
+        hints_file_path=None,
+        root_class_name=root_class_name,
+        slots=slots,
+        frozen=frozen,
+        batch_classes=batch_classes,
+        lazy=lazy,
+        validators=validators,
+        split_modules=split_modules,
+        enum_converters=enum_converters,
+    )
+    generator = ObjectModelModuleGenerator(args, schema, code_gen_hints or {})
+    return generator.render()
+
+
+def load_module(schema, root_class_name, module_name=None, **options):
+    """Generates an object model from a JSON schema and returns it as a module.
+
+    :param schema: the JSON schema, as a dict.
+    :param root_class_name: the name of the class at the root of the object model.
+    :param module_name: the name of the returned module.
+    :param options: code_gen_hints and the code generation options, as for
+        generate_sources.
+
+    The generated classes are compiled and executed into a new module
+    object, without going through the filesystem or the import system; the
+    module is not added to sys.modules.
+    """
+
+    if options.get("split_modules"):
+        raise ValueError("load_module makes a single module, split_modules is not supported")
+
+    module_name = module_name or root_class_name.lower()
+    sources = generate_sources(schema, root_class_name, module_name, **options)
+    file_name = util.class_name_to_private_module_name(root_class_name) + ".py"
+    source = sources[file_name]
+
+    # a pseudo file name, registered with linecache so that tracebacks show the source
+    filename = "<" + module_name + "/" + file_name + ">"
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+
+    module = types.ModuleType(module_name)
+    module.__file__ = filename
+    exec(compile(source, filename, "exec"), module.__dict__)
+    return module
@@ -0,0 +1,267 @@
+import array
+import gzip
+import sys
+
+from jschema_to_python_2 import json_backend
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# array typecodes for the scalar schema types (see utilities._TYPE_MAPPING);
+# strings are kept in interned lists, everything else in plain lists
+_TYPECODES = {
+    "integer": "q",
+    "number": "d",
+    "boolean": "b",
+}
+
+# the type of the values each typed array holds; values of another type (such
+# as an int in a float column) make the column fall back to a plain list, so
+# that rows give back the values they were built from
+_PYTHON_TYPES = {
+    "q": int,
+    "d": float,
+    "b": bool,
+}
+
+_NUMPY_DTYPES = {
+    "q": "int64",
+    "d": "float64",
+    "b": "bool",
+}
+
+# number of JSON Lines records parsed before they are appended column by column
+_CHUNK_SIZE = 10000
+
+
+class ColumnarBatch(object):
+    """Base class of the generated <ClassName>Batch containers.
+
+    Subclasses set record_class to the generated class and columns to a tuple of
+    (python property name, schema property name, schema type) triples, where the
+    schema type is one of the _TYPE_MAPPING keys, or None for anything else.
+
+    Integer, number and boolean columns are stored in typed arrays, with a
+    bytearray marking the rows where the value was missing or null. A number
+    column holding only ints is stored as integers, and one mixing ints and
+    floats as a plain list. String columns are lists of interned strings, and
+    other columns hold the parsed JSON values as they are. Another bytearray
+    per column marks the rows that had no value at all, which are left out of
+    row_dict so that the class defaults apply. Rows are only built into
+    record_class instances when they are accessed.
+    """
+
+    record_class = None
+    columns = ()
+
+    def __init__(self):
+        self._length = 0
+        self._values = {}
+        self._missing = {}
+        self._absent = {}
+        self._types = {}
+        for python_name, schema_name, schema_type in self.columns:
+            self._absent[python_name] = bytearray()
+            typecode = _TYPECODES.get(schema_type)
+            if typecode:
+                self._values[python_name] = array.array(typecode)
+                self._missing[python_name] = bytearray()
+            else:
+                self._values[python_name] = []
+            self._types[python_name] = schema_type
+
+    @classmethod
+    def from_dicts(cls, records):
+        batch = cls()
+        batch.extend(records)
+        return batch
+
+    @classmethod
+    def from_jsonl(cls, path):
+        batch = cls()
+        opener = gzip.open if str(path).endswith(".gz") else open
+        with opener(path, "rb") as file_obj:
+            chunk = []
+            for line in file_obj:
+                line = line.strip()
+                if line:
+                    chunk.append(json_backend.loads(line))
+                if len(chunk) >= _CHUNK_SIZE:
+                    batch.extend(chunk)
+                    chunk = []
+            batch.extend(chunk)
+        return batch
+
+    def append(self, record):
+        self.extend([record])
+
+    def extend(self, records):
+        if not isinstance(records, list):
+            records = list(records)
+        for python_name, schema_name, schema_type in self.columns:
+            values = [record.get(schema_name) for record in records]
+            self._extend_column(python_name, values)
+            if None in values:
+                self._absent[python_name].extend(bytes(schema_name not in record for record in records))
+            else:
+                self._absent[python_name].extend(bytes(len(records)))
+        self._length += len(records)
+
+    def _extend_column(self, python_name, values):
+        column = self._values[python_name]
+        if isinstance(column, array.array):
+            if not self._fits_column(python_name, values):
+                # the data doesn't fit the inferred type, fall back to a plain list
+                self._to_object_column(python_name)
+                self._values[python_name].extend(values)
+                return
+            column = self._values[python_name]
+            missing = bytes(value is None for value in values)
+            typed_values = values
+            if any(missing):
+                typed_values = [0 if value is None else value for value in values]
+            try:
+                column.extend(typed_values)
+            except OverflowError:
+                # e.g. a 70-bit integer
+                self._to_object_column(python_name)
+                self._values[python_name].extend(values)
+                return
+            self._missing[python_name].extend(missing)
+        elif self._types[python_name] == "string":
+            intern = sys.intern
+            try:
+                column.extend([value if value is None else intern(value) for value in values])
+            except TypeError:
+                self._types[python_name] = None
+                column.extend(values)
+        else:
+            column.extend(values)
+
+    def _fits_column(self, python_name, values):
+        # whether the values can be stored in the typed column as they are; a
+        # number column that has no values yet switches to integers for ints
+        column = self._values[python_name]
+        python_type = _PYTHON_TYPES[column.typecode]
+        if all(type(value) is python_type for value in values if value is not None):
+            return True
+        if self._types[python_name] != "number" or 0 in self._missing[python_name]:
+            return False
+        value_types = {type(value) for value in values if value is not None}
+        if value_types != {int} and value_types != {float}:
+            return False
+        typecode = "q" if value_types == {int} else "d"
+        self._values[python_name] = array.array(typecode, [0]) * len(column)
+        return True
+
+    def _to_object_column(self, python_name):
+        column = self._values[python_name]
+        missing = self._missing.pop(python_name)
+        self._values[python_name] = [None if is_missing else value for value, is_missing in zip(self._column_values(python_name, column), missing)]
+        self._types[python_name] = None
+
+    def _column_values(self, python_name, column):
+        if self._types[python_name] == "boolean":
+            return [bool(value) for value in column]
+        return column.tolist()
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("batch index out of range")
+        return self.record_class.from_dict(self.row_dict(index))
+
+    def row_dict(self, index):
+        row = {}
+        for python_name, schema_name, schema_type in self.columns:
+            if self._absent[python_name][index]:
+                continue
+            value = self._values[python_name][index]
+            missing = self._missing.get(python_name)
+            if missing is not None:
+                if missing[index]:
+                    value = None
+                elif self._types[python_name] == "boolean":
+                    value = bool(value)
+            row[schema_name] = value
+        return row
+
+    def column(self, python_name):
+        """Returns the values of a column.
+
+        Typed columns come back as a NumPy array sharing the batch's memory when
+        NumPy is installed (so that e.g. batch.where(batch.column("Id") > 10)
+        is vectorized), and as an array.array otherwise. Missing values read as
+        0 in typed columns, see missing().
+        """
+
+        column = self._values[python_name]
+        if numpy is not None and isinstance(column, array.array):
+            return numpy.frombuffer(column, dtype=_NUMPY_DTYPES[column.typecode])
+        return column
+
+    def missing(self, python_name):
+        """Returns the mask of rows where a typed column's value was missing or null."""
+
+        missing = self._missing.get(python_name)
+        if missing is None:
+            return [value is None for value in self._values[python_name]]
+        if numpy is not None:
+            return numpy.frombuffer(missing, dtype="bool")
+        return [bool(is_missing) for is_missing in missing]
+
+    def filter(self, python_name, predicate):
+        """Returns a new batch with the rows whose column value satisfies predicate."""
+
+        values = self._values[python_name]
+        missing = self._missing.get(python_name)
+        if missing is not None:
+            if self._types[python_name] == "boolean":
+                values = [bool(value) for value in values]
+            values = [None if is_missing else value for value, is_missing in zip(values, missing)]
+        return self.take([index for index, value in enumerate(values) if predicate(value)])
+
+    def where(self, mask):
+        """Returns a new batch with the rows where mask (a sequence of booleans, or a NumPy boolean array) is true."""
+
+        if numpy is not None and isinstance(mask, numpy.ndarray):
+            return self.take(numpy.flatnonzero(mask))
+        return self.take([index for index, keep in enumerate(mask) if keep])
+
+    def take(self, indices):
+        """Returns a new batch with the rows at the given indices, in that order."""
+
+        batch = self.__class__()
+        use_numpy = numpy is not None and isinstance(indices, numpy.ndarray)
+        for python_name in self._values:
+            column = self._values[python_name]
+            if isinstance(column, array.array):
+                if use_numpy:
+                    selected = array.array(column.typecode, self.column(python_name)[indices].tobytes())
+                    missing = bytearray(numpy.frombuffer(self._missing[python_name], dtype="uint8")[indices].tobytes())
+                else:
+                    selected = array.array(column.typecode, [column[index] for index in indices])
+                    missing = bytearray(self._missing[python_name][index] for index in indices)
+                batch._values[python_name] = selected
+                batch._missing[python_name] = missing
+            else:
+                batch._values[python_name] = [column[index] for index in indices]
+                batch._missing.pop(python_name, None)
+            absent = self._absent[python_name]
+            if use_numpy:
+                batch._absent[python_name] = bytearray(numpy.frombuffer(absent, dtype="uint8")[indices].tobytes())
+            else:
+                batch._absent[python_name] = bytearray(absent[index] for index in indices)
+            batch._types[python_name] = self._types[python_name]
+        batch._length = len(indices)
+        return batch
@@ -0,0 +1,237 @@
+import collections
+import copy
+import hashlib
+import json
+import threading
+
+import attr
+
+from jschema_to_python_2 import json_backend
+import jschema_to_python_2.utilities as util
+
+CacheInfo = collections.namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+_FROM_DICT_CONTAINER = 0
+_FROM_DICT_REQUIRED = 1
+_FROM_DICT_OPTIONAL = 2
+
+
+class ClassFactory(object):
+    """Builds the classes of an object model at runtime, without generating code.
+
+    The classes are the ones the generators would emit for the same schema,
+    made with attr.make_class: the root class and one class per definition
+    under "$defs" (or "definitions"), with the same attribute order,
+    defaults, schema_property_name metadata, keyword renaming and
+    from_dict/from_json class methods.
+
+    Results are kept in an LRU cache of up to maxsize entries, keyed by a
+    hash of the canonical JSON of the schema and the options.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def make_classes(self, schema, root_class_name, slots=False, frozen=False):
+        """Returns the classes of the object model of a JSON schema.
+
+        :param schema: the JSON schema, as a dict.
+        :param root_class_name: the name of the class at the root of the object model.
+        :param slots: make slotted classes, as --slots does.
+        :param frozen: make immutable classes, as --frozen does.
+
+        Returns a dict of the classes by class name.
+        """
+
+        key = _make_cache_key(schema, root_class_name, slots, frozen)
+        with self._lock:
+            classes = self._cache.get(key)
+            if classes is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return dict(classes)
+            self._misses += 1
+
+        classes = _build_classes(schema, root_class_name, slots, frozen)
+
+        with self._lock:
+            self._cache[key] = classes
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        return dict(classes)
+
+    def cache_info(self):
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize, len(self._cache))
+
+    def cache_clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._hits = 0
+            self._misses = 0
+
+
+_default_factory = ClassFactory()
+
+make_classes = _default_factory.make_classes
+cache_info = _default_factory.cache_info
+cache_clear = _default_factory.cache_clear
+
+
+def _make_cache_key(schema, root_class_name, slots, frozen):
+    canonical_json = json_backend.dumps_sorted([schema, root_class_name, slots, frozen])
+    return hashlib.sha256(canonical_json.encode("utf-8")).hexdigest()
+
+
+def _build_classes(schema, root_class_name, slots, frozen):
+    class_schemas = [(root_class_name, schema)]
+    definition_schemas = schema.get("definitions") or schema.get("$defs") or {}
+    for definition_key in definition_schemas:
+        class_name = util.capitalize_first_letter(definition_key)
+        class_schemas.append((class_name, definition_schemas[definition_key]))
+
+    # nested classes are looked up by name when from_dict runs, so that the
+    # classes can refer to each other in any order
+    classes = {}
+    for class_name, class_schema in class_schemas:
+        classes[class_name] = _build_class(class_name, class_schema, classes, slots, frozen)
+    return classes
+
+
+def _build_class(class_name, class_schema, classes, slots, frozen):
+    attributes = collections.OrderedDict()
+    from_dict_fields = []
+    property_schemas = class_schema.get("properties") or {}
+    # the same order and required properties as ClassGenerator
+    required_property_names = util.order_required_property_names(class_schema)
+    for schema_property_name in util.order_property_names(class_schema, required_property_names):
+        property_schema = property_schemas[schema_property_name]
+        python_property_name = util.ensure_valid_class_or_attribute_name(schema_property_name)
+        if python_property_name in util._KEYWORD_PROPS:
+            python_property_name = "_" + python_property_name
+        optional = schema_property_name not in required_property_names
+
+        attrib_arguments = {"metadata": {"schema_property_name": schema_property_name}}
+        factory = util.get_property_factory(property_schema)
+        if factory:
+            attrib_arguments["factory"] = factory
+        elif optional:
+            attrib_arguments["default"] = _make_default(property_schema)
+        if frozen and not util.is_hashable_property(property_schema):
+            # lists and dicts can't be hashed
+            attrib_arguments["hash"] = False
+        attributes[python_property_name] = attr.ib(**attrib_arguments)
+
+        if factory:
+            kind = _FROM_DICT_CONTAINER
+            default = factory
+        elif optional:
+            kind = _FROM_DICT_OPTIONAL
+            default = attrib_arguments["default"]
+        else:
+            kind = _FROM_DICT_REQUIRED
+            default = None
+        # attrs strips leading underscores from the __init__ argument names
+        from_dict_fields.append((
+            python_property_name.lstrip("_"), schema_property_name, kind, default,
+            _get_converter_target(property_schema),
+        ))
+
+    base = object
+    if type(class_schema.get("type")) == str and class_schema["type"] in util._TYPE_MAPPING:
+        base = _BUILTIN_TYPES[class_schema["type"]]
+    elif "properties" not in class_schema:
+        # untyped/dynamic schema objects, such as .NET's dictionaries
+        base = dict
+
+    attributes_arguments = {}
+    if slots:
+        attributes_arguments["slots"] = True
+    if frozen:
+        attributes_arguments["frozen"] = True
+        # as in util.make_class_decorator, only slotted classes keep the cached hash out of __dict__
+        if slots:
+            attributes_arguments["cache_hash"] = True
+    cls = attr.make_class(class_name, attributes, bases=(base,), **attributes_arguments)
+
+    if base is dict:
+        cls.from_dict = classmethod(_dict_from_dict)
+    else:
+        cls.from_dict = classmethod(_make_from_dict(from_dict_fields, classes))
+    cls.from_json = classmethod(_from_json)
+    return cls
+
+
+_BUILTIN_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool,
+}
+
+
+def _make_default(property_schema):
+    default = property_schema.get("default")
+    if not default:
+        return None
+    if property_schema.get("type") == "array":
+        return attr.Factory(lambda: copy.deepcopy(default))
+    return default
+
+
+# Returns (class name, whether the value is an array of them), or None, following
+# util.make_from_dict_converter.
+def _get_converter_target(property_schema):
+    ref = property_schema.get("$ref")
+    if ref:
+        return util.ref_to_class_name(ref), False
+    if property_schema.get("type") == "array":
+        items_schema = property_schema.get("items")
+        if isinstance(items_schema, dict) and items_schema.get("$ref"):
+            return util.ref_to_class_name(items_schema["$ref"]), True
+    return None
+
+
+def _make_from_dict(from_dict_fields, classes):
+    def from_dict(cls, d):
+        kwargs = {}
+        for argument_name, schema_property_name, kind, default, target in from_dict_fields:
+            if kind == _FROM_DICT_CONTAINER:
+                value = d.get(schema_property_name)
+                if value is None:
+                    value = default()
+            elif kind == _FROM_DICT_REQUIRED:
+                value = d[schema_property_name]
+            elif target is None:
+                kwargs[argument_name] = d.get(schema_property_name, default)
+                continue
+            else:
+                value = d.get(schema_property_name)
+                if value is None:
+                    kwargs[argument_name] = default
+                    continue
+            if target is not None:
+                target_class = classes[target[0]]
+                if target[1]:
+                    value = [target_class.from_dict(item) for item in value]
+                else:
+                    value = target_class.from_dict(value)
+            kwargs[argument_name] = value
+        return cls(**kwargs)
+
+    return from_dict
+
+
+def _dict_from_dict(cls, d):
+    obj = cls()
+    obj.update(d)
+    return obj
+
+
+def _from_json(cls, s):
+    return cls.from_dict(json.loads(s))
@@ -1,51 +1,149 @@
-import sys
+import json
+
 from jschema_to_python_2.python_file_generator import PythonFileGenerator
 import jschema_to_python_2.utilities as util
 
 class ClassGenerator(PythonFileGenerator):
-    def __init__(self, class_schema, class_name, code_gen_hints, output_directory):
+    def __init__(self, class_schema, class_name, code_gen_hints, output_directory, slots=False, frozen=False, batch_classes=False, lazy=False, validators=False, package_name=None, enum_converters=None):
         super(ClassGenerator, self).__init__(output_directory)
         self.class_schema = class_schema
-        self.required_property_names = class_schema.get("required")
-        if self.required_property_names:
-            self.required_property_names.sort()
-
-            # if any required properties are arrays or objects, we can move them to the end of the list
-            # this is because the factory functions for these types will not work if the property is not already defined
-            for property_name in self.required_property_names:
-                property_schema = class_schema["properties"][property_name]
-                if property_schema.get("type") == "array" or property_schema.get("type") == "object":
-                    self.required_property_names.remove(property_name)
-                    self.required_property_names.append(property_name)
-
-            # find array or object items in schema (that are not in the required list) and add them to it
-            # these must also be added after mandatory/required items for their factory to work
-            for property_name in class_schema["properties"]:
-                property_schema = class_schema["properties"][property_name]
-                if property_schema.get("type") == "array" or property_schema.get("type") == "object":
-                    if property_name not in self.required_property_names:
-                        self.required_property_names.append(property_name)
-            
+        # ordered for attrs (a new list, the validators need the schema's own "required" list)
+        self.required_property_names = util.order_required_property_names(class_schema)
         self.class_name = class_name
         self.code_gen_hints = code_gen_hints
+        self.slots = slots
+        self.frozen = frozen
+        self.batch_classes = batch_classes
+        self.lazy = lazy
+        self.validators = validators
+        # with one module per class (--split-modules), the name of the package the
+        # classes this one refers to are imported from
+        self.package_name = package_name
+        # how the values of string properties with an enum are converted: "intern"
+        # or "enum" (a generated StrEnum per property), or None to keep them as they are
+        self.enum_converters = enum_converters
+        # looked up for every property, often several times
+        self._required_property_name_set = set(self.required_property_names)
+        self._ordered_property_names = None
+        self._python_property_names = {}
+        self._enum_class_names = None
         self.file_path = self._make_class_file_path()
         # self.object_frequency_table = util.make_frequency_table(self.class_schema, {})
         # self.object_frequency_table = dict(sorted(self.object_frequency_table.items(), key=lambda x: x[1], reverse=True))
 
-    def __del__(self):
-        sys.stdout = sys.__stdout__
-
     def generate(self):
-        with open(self.file_path, "w") as sys.stdout:
-            self.write_generation_comment()
+        self.write_file(self.file_path, self.render())
+
+    def write_source(self):
+        self.write_generation_comment()
+        self._write_imports()
+        if self._is_lazy():
+            self._write_lazy_class()
+        else:
             self._write_class_declaration()
             self._write_class_description()
             self._write_class_body()
+            self._write_from_dict_methods()
+        self._write_validate_methods()
+        self._write_batch_class()
+        self._write_reference_imports()
 
     def _make_class_file_path(self):
         class_module_name = util.class_name_to_private_module_name(self.class_name)
         return self.make_output_file_path(class_module_name + ".py")
 
+    def _write_imports(self):
+        self.write_line("import attr")
+        self.write_line("import json")
+        if self.batch_classes or self.lazy or self.validators or self.enum_converters:
+            self.write_line("")
+        if self.batch_classes:
+            self.write_line("from jschema_to_python_2.batch import ColumnarBatch")
+        if self.lazy:
+            self.write_line("from jschema_to_python_2.lazy import LazyRecord, lazy_property")
+        if self.validators:
+            self.write_line("from jschema_to_python_2 import validation")
+            self.write_line("from jschema_to_python_2.validation import MISSING, ValidationError, json_type_name")
+        if self.enum_converters == "enum":
+            self.write_line("from jschema_to_python_2.enums import StrEnum")
+        elif self.enum_converters == "intern":
+            self.write_line("from jschema_to_python_2.enums import intern_value")
+        self.write_line("")
+        self.write_line("")  # The black formatter wants two blank lines here.
+
+    def _write_reference_imports(self):
+        if not self.package_name:
+            return
+        class_names = self._get_referenced_class_names()
+        if not class_names:
+            return
+        # imported last, once this class is defined, so that modules whose
+        # classes refer to each other can import each other
+        self.write_line("")
+        self.write_line("")
+        for class_name in class_names:
+            class_module_name = util.class_name_to_private_module_name(class_name)
+            self.write_line(
+                "from " + self.package_name + "." + class_module_name + " import " + class_name + "  # noqa: E402"
+            )
+
+    def _get_referenced_class_names(self):
+        # the classes named by the from_dict converters (util.make_from_dict_converter)
+        # and the validate methods, which also follow nested arrays and inline objects
+        class_names = set()
+        for property_schema in (self.class_schema.get("properties") or {}).values():
+            util.collect_referenced_class_names(property_schema, class_names)
+        class_names.discard(self.class_name)
+        return sorted(class_names)
+
+    def _write_enum_classes(self):
+        # one StrEnum per property with an enum, nested in the class so that
+        # its name only has to be unique among the class's attributes
+        enum_class_names = self._get_enum_class_names()
+        for schema_property_name in self._get_ordered_property_names():
+            enum_class_name = enum_class_names.get(schema_property_name)
+            if not enum_class_name:
+                continue
+            values = util.get_property_enum_values(self.class_schema["properties"][schema_property_name])
+            self.write_line("    class " + enum_class_name + "(StrEnum):")
+            for value, member_name in util.make_enum_member_names(values).items():
+                # a JSON string is also a Python string literal
+                self.write_line("        " + member_name + " = " + json.dumps(value, ensure_ascii=False))
+            self.write_line("")
+
+    def _get_enum_class_names(self):
+        # the names of the nested enums, by schema property name, e.g. TypeEnum for Type
+        if self._enum_class_names is not None:
+            return self._enum_class_names
+        self._enum_class_names = {}
+        if self.enum_converters != "enum":
+            return self._enum_class_names
+        property_names = self._get_ordered_property_names()
+        used_names = {self._make_python_property_name(name) for name in property_names}
+        for schema_property_name in property_names:
+            if not util.get_property_enum_values(self.class_schema["properties"][schema_property_name]):
+                continue
+            python_property_name = self._make_python_property_name(schema_property_name).lstrip("_")
+            name = util.capitalize_first_letter(python_property_name) + "Enum"
+            unique_name = name
+            number = 2
+            while unique_name in used_names:
+                unique_name = name + str(number)
+                number += 1
+            used_names.add(unique_name)
+            self._enum_class_names[schema_property_name] = unique_name
+        return self._enum_class_names
+
+    def _get_enum_converter(self, schema_property_name):
+        # the function that converts the values of a property with an enum, or None
+        if not self.enum_converters:
+            return None
+        if not util.get_property_enum_values(self.class_schema["properties"][schema_property_name]):
+            return None
+        if self.enum_converters == "intern":
+            return "intern_value"
+        return self.class_name + "." + self._get_enum_class_names()[schema_property_name] + ".from_value"
+
     def _write_class_declaration(self):
         parent_type = "object"
         if "type" in self.class_schema and type(self.class_schema["type"]) == str and self.class_schema["type"] in util._TYPE_MAPPING:
@@ -56,68 +154,191 @@ class ClassGenerator(PythonFileGenerator):
         else:
             # TODO: handle type unions in schema, where value would be list of type names, so we will need Py3 typings
             pass
-        print("import attr")
-        print("")
-        print("")  # The black formatter wants two blank lines here.
-        print("@attr.s")
-        print("class " + self.class_name + "(" + parent_type + "):")
+        self.write_line(util.make_class_decorator(self.slots, self.frozen))
+        self.write_line("class " + self.class_name + "(" + parent_type + "):")
 
     def _write_class_description(self):
         description = self.class_schema.get("description")
         if description:
-            print('    """' + description + '"""')
-            print("")  # The black formatter wants a blank line here.
+            self.write_line('    """' + description + '"""')
+            self.write_line("")  # The black formatter wants a blank line here.
 
     def _write_class_body(self):
-        if "properties" not in self.class_schema:
-            print("    pass")
+        # classes without properties still get a body from _write_from_dict_methods
+        self._write_enum_classes()
+        for schema_property_name in self._get_ordered_property_names():
+            attrib = self._make_attrib(schema_property_name)
+            self.write_line(attrib)
+
+    def _get_ordered_property_names(self):
+        if self._ordered_property_names is None:
+            self._ordered_property_names = util.order_property_names(
+                self.class_schema, self.required_property_names
+            )
+        return self._ordered_property_names
+
+    def _write_from_dict_methods(self):
+        # Straight-line constructors, so that building nested objects from parsed
+        # JSON doesn't need to reflect over the attrs fields at runtime.
+        self.write_line("")
+        self.write_line("    @classmethod")
+        self.write_line("    def from_dict(cls, d):")
+        if "properties" not in self.class_schema and self.class_schema.get("type") not in util._TYPE_MAPPING:
+            # untyped/dynamic objects are generated as dict subclasses
+            self.write_line("        obj = cls()")
+            self.write_line("        obj.update(d)")
+            self.write_line("        return obj")
+        else:
+            arguments = []
+            for schema_property_name in self._get_ordered_property_names():
+                arguments.append(self._make_from_dict_argument(schema_property_name))
+
+            for argument, value_statement in arguments:
+                if value_statement:
+                    self.write_line("        " + value_statement)
+            if not arguments:
+                self.write_line("        return cls()")
+            else:
+                self.write_line("        return cls(")
+                for argument, value_statement in arguments:
+                    self.write_line("            " + argument + ",")
+                self.write_line("        )")
+        self.write_line("")
+        self.write_line("    @classmethod")
+        self.write_line("    def from_json(cls, s):")
+        self.write_line("        return cls.from_dict(json.loads(s))")
+
+    def _write_validate_methods(self):
+        # Straight-line checks of the type, required, properties, items and $ref
+        # keywords of the class schema, see util.make_validation_lines.
+        if not self.validators:
             return
-        property_schemas = self.class_schema["properties"]
-        if not property_schemas:
-            print("    pass")
+        self.write_line("")
+        self.write_line("    @classmethod")
+        self.write_line('    def validate(cls, d, path="$"):')
+        lines = util.make_validation_lines(self.class_schema, "d", "path", is_class_schema=True)
+        for line in lines or ["pass"]:
+            self.write_line("        " + line)
+        self.write_line("")
+        self.write_line("    @classmethod")
+        self.write_line("    def validate_records(cls, records):")
+        self.write_line("        return validation.validate_records(cls.validate, records)")
+        self.write_line("")
+        self.write_line("    @classmethod")
+        self.write_line("    def validate_jsonl(cls, source):")
+        self.write_line("        return validation.validate_jsonl(cls.validate, source)")
+
+    def _is_lazy(self):
+        # untyped/dynamic objects stay dict subclasses
+        return self.lazy and bool(self.class_schema.get("properties"))
+
+    def _write_lazy_class(self):
+        # properties are read from the wrapped JSON document on first access,
+        # see jschema_to_python_2.lazy
+        self.write_line("class " + self.class_name + "(LazyRecord):")
+        self._write_class_description()
+        self.write_line("    __slots__ = ()")
+        if self.frozen:
+            self.write_line("    _frozen = True")
+        self.write_line("")
+        self._write_enum_classes()
+        for schema_property_name in self._get_ordered_property_names():
+            property_schema = self.class_schema["properties"][schema_property_name]
+            default = "None"
+            if self._is_optional(schema_property_name):
+                default = str(self._make_initializer(property_schema))
+            self.write_line("".join([
+                "    ", self._make_python_property_name(schema_property_name), " = ",
+                util.make_lazy_property(
+                    schema_property_name, property_schema, default, self._get_enum_converter(schema_property_name)
+                ),
+            ]))
+
+    def _write_batch_class(self):
+        # a struct-of-arrays container for many instances, see jschema_to_python_2.batch
+        if not self.batch_classes or not self.class_schema.get("properties"):
             return
+        self.write_line("")
+        self.write_line("")
+        self.write_line("class " + self.class_name + "Batch(ColumnarBatch):")
+        self.write_line("    record_class = " + self.class_name)
+        self.write_line("    columns = (")
+        for schema_property_name in self._get_ordered_property_names():
+            property_schema = self.class_schema["properties"][schema_property_name]
+            self.write_line("".join([
+                '        ("', self._make_python_property_name(schema_property_name), '", "',
+                schema_property_name, '", ', util.make_batch_column_type(property_schema), "),",
+            ]))
+        self.write_line("    )")
 
-        schema_property_names = sorted(property_schemas.keys())
+    def _make_from_dict_argument(self, schema_property_name):
+        # returns the keyword argument passed to the constructor, and the statement
+        # (if any) that has to run before it to fetch the value
+        python_property_name = self._make_python_property_name(schema_property_name)
+        # attrs strips leading underscores from the __init__ argument names
+        init_argument_name = python_property_name.lstrip("_")
+        property_schema = self.class_schema["properties"][schema_property_name]
+        key = '"' + schema_property_name + '"'
+        property_type = property_schema.get("type")
+        enum_converter = self._get_enum_converter(schema_property_name)
 
-        # attrs requires that mandatory attributes be declared before optional
-        # attributes.
-        if self.required_property_names:
-            for schema_property_name in self.required_property_names:
-                attrib = self._make_attrib(schema_property_name)
-                print(attrib)
+        if property_type == "array" or property_type == "object":
+            # these have a factory, see _make_attrib; null is read as empty too
+            default = "[]" if property_type == "array" else "{}"
+            value = "d.get(" + key + ") or " + default
+            converted_value = util.make_from_dict_converter(property_schema, value, enum_converter)
+            return init_argument_name + "=" + (converted_value or value), None
 
-        for schema_property_name in schema_property_names:
-            if self._is_optional(schema_property_name):
-                attrib = self._make_attrib(schema_property_name)
-                print(attrib)
+        if not self._is_optional(schema_property_name):
+            value = "d[" + key + "]"
+            converted_value = util.make_from_dict_converter(property_schema, value, enum_converter)
+            return init_argument_name + "=" + (converted_value or value), None
+
+        default = str(self._make_initializer(property_schema))
+        converted_value = util.make_from_dict_converter(property_schema, "value_" + python_property_name, enum_converter)
+        if not converted_value:
+            return init_argument_name + "=d.get(" + key + ", " + default + ")", None
+
+        value_statement = "value_" + python_property_name + " = d.get(" + key + ")"
+        argument = "".join([
+            init_argument_name, "=", default, " if value_", python_property_name,
+            " is None else ", converted_value,
+        ])
+        return argument, value_statement
+
+    def _make_python_property_name(self, schema_property_name):
+        python_property_name = self._python_property_names.get(schema_property_name)
+        if python_property_name is None:
+            python_property_name = self._make_python_property_name_from_schema_property_name(
+                schema_property_name
+            )
+            if python_property_name in util._KEYWORD_PROPS:
+                python_property_name = "_" + python_property_name
+            self._python_property_names[schema_property_name] = python_property_name
+        return python_property_name
 
     def _make_attrib(self, schema_property_name):
-        python_property_name = self._make_python_property_name_from_schema_property_name(
-            schema_property_name
-        )
-        if python_property_name in util._KEYWORD_PROPS:
-            python_property_name = "_" + python_property_name
-        
+        python_property_name = self._make_python_property_name(schema_property_name)
+
         attrib = "".join(["    ", python_property_name, " = attr.ib("])
-        if self.class_schema["properties"][schema_property_name].get("type") == "array":
-            attrib = "".join([attrib, "factory=list, "])
-        elif self.class_schema["properties"][schema_property_name].get("type") == "object":
-            attrib = "".join([attrib, "factory=dict, "])
+        property_schema = self.class_schema["properties"][schema_property_name]
+        factory = util.get_property_factory(property_schema)
+        if factory:
+            attrib = "".join([attrib, "factory=", factory.__name__, ", "])
 
         if self._is_optional(schema_property_name):
-            property_schema = self.class_schema["properties"][schema_property_name]
             default_setter = self._make_default_setter(property_schema)
             attrib = "".join([attrib, default_setter, ", "])
+        if self.frozen and not util.is_hashable_property(property_schema):
+            # lists and dicts can't be hashed
+            attrib = "".join([attrib, "hash=False, "])
         attrib = "".join(
             [attrib, 'metadata={"schema_property_name": "', schema_property_name, '"})']
         )
         return attrib
 
     def _is_optional(self, schema_property_name):
-        return (
-            not self.required_property_names
-            or schema_property_name not in self.required_property_names
-        )
+        return schema_property_name not in self._required_property_name_set
 
     def _make_default_setter(self, property_schema):
         initializer = self._make_initializer(property_schema)
@@ -2,17 +2,27 @@ import argparse
 
 from jschema_to_python_2.object_model_module_generator import ObjectModelModuleGenerator
 from jschema_to_python_2 import __version__
+from jschema_to_python_2 import json_backend
+from jschema_to_python_2.profiler import PhaseProfiler
 
 
 def main():
     parser = _init_parser()
     args = parser.parse_args()
+    if args.profile_cprofile and not args.profile:
+        parser.error("--profile-cprofile requires --profile")
 
     _display_args(args)
 
-    generator = ObjectModelModuleGenerator(args)
+    profiler = PhaseProfiler(bool(args.profile), args.profile_cprofile)
+    generator = ObjectModelModuleGenerator(args, profiler=profiler)
     generator.generate()
 
+    if args.profile:
+        profiler.write_report(args.profile)
+        if args.verbose:
+            print("Profile written to " + args.profile)
+
     if args.verbose:
         print("Done.")
 
@@ -52,6 +62,52 @@ def _init_parser():
         action="store_true",
         help="overwrite the output directory if it exists",
     )
+    parser.add_argument(
+        "--slots",
+        action="store_true",
+        help="generate slotted classes, which have no per-instance __dict__",
+    )
+    parser.add_argument(
+        "--frozen",
+        action="store_true",
+        help="generate immutable classes that cache their hash",
+    )
+    parser.add_argument(
+        "--batch-classes",
+        action="store_true",
+        help="also generate a columnar <ClassName>Batch container for each class",
+    )
+    parser.add_argument(
+        "--lazy",
+        action="store_true",
+        help="generate classes that wrap the raw JSON and decode properties on first access",
+    )
+    parser.add_argument(
+        "--validators",
+        action="store_true",
+        help="also generate validate methods that check parsed JSON against the schema of each class",
+    )
+    parser.add_argument(
+        "--split-modules",
+        action="store_true",
+        help="generate one module per class, imported on first access from the package",
+    )
+    parser.add_argument(
+        "--enum-converters",
+        choices=["intern", "enum"],
+        help="convert the values of string properties with an enum when building objects: "
+        "intern them, or map them to a generated Enum class per property",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="REPORT_PATH",
+        help="write the time, CPU time and peak memory of each phase, and counters, to a JSON report",
+    )
+    parser.add_argument(
+        "--profile-cprofile",
+        metavar="STATS_PATH",
+        help="with --profile, also dump cProfile statistics of the slowest phase",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
@@ -71,6 +127,7 @@ def _display_args(args):
         )
         print("Generating Python classes...")
     if args.verbose > 1:
+        print("    using the " + json_backend.BACKEND + " JSON backend")
         print("    from JSON schema " + args.schema_path)
         print("    to module " + args.module_name)
         print("    in directory " + args.output_directory)
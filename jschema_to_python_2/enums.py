@@ -0,0 +1,43 @@
+import enum
+import sys
+
+
+class StrEnum(str, enum.Enum):
+    """Base class of the enums generated for string properties with an "enum"
+    (--enum-converters enum).
+
+    Members are strings equal to their values, so they compare, hash and
+    serialize to JSON like the strings they replace, but each value is held
+    once however many objects have it.
+    """
+
+    def __str__(self):
+        return self.value
+
+    @classmethod
+    def from_value(cls, value):
+        """Returns the member whose value is value.
+
+        :param value: the parsed JSON value of the property.
+
+        A string that isn't the value of a member, e.g. one that only shows up
+        after the schema was inferred, is returned interned, and any other
+        value as it is.
+        """
+
+        if type(value) is not str:
+            return value
+        member = cls._value2member_map_.get(value)
+        if member is None:
+            return sys.intern(value)
+        return member
+
+
+def intern_value(value):
+    """Returns value interned if it is a string, so that equal strings are held
+    once (--enum-converters intern), and any other value as it is.
+    """
+
+    if type(value) is str:
+        return sys.intern(value)
+    return value
@@ -1,37 +1,51 @@
-import sys
 from jschema_to_python_2.python_file_generator import PythonFileGenerator
 import jschema_to_python_2.utilities as util
 
 
 class InitFileGenerator(PythonFileGenerator):
-    def __init__(self, module_name, root_schema, root_class_name, output_directory):
+    def __init__(self, module_name, root_schema, root_class_name, output_directory, split_modules=False, batch_classes=False):
         super(InitFileGenerator, self).__init__(output_directory)
         self.module_name = module_name
         self.root_schema = root_schema
         self.root_class_name = root_class_name
-
-    def __del__(self):
-        sys.stdout = sys.__stdout__
+        self.split_modules = split_modules
+        self.batch_classes = batch_classes
 
     def generate(self):
-        file_path = self.make_output_file_path("__init__.py")
-        with open(file_path, "w") as sys.stdout:
-            self.write_generation_comment()
-            self._write_import_statements()
+        self.write_file(self.make_output_file_path("__init__.py"), self.render())
 
-    def _write_import_statements(self):
-        self._write_import_statement(self.root_class_name)
+    def write_source(self):
+        self.write_generation_comment()
+        if self.split_modules:
+            self._write_lazy_imports()
+        else:
+            self._write_import_statements()
 
-        definition_schemas = self.root_schema.get("definitions")
+    def _get_class_schemas(self):
+        # the root class, then the definition classes
+        class_schemas = [(self.root_class_name, self.root_schema)]
+        definition_schemas = self.root_schema.get("definitions") or self.root_schema.get("$defs")
         if definition_schemas:
-            definition_keys = sorted(definition_schemas.keys())
-            for definition_key in definition_keys:
+            for definition_key in sorted(definition_schemas.keys()):
                 class_name = util.capitalize_first_letter(definition_key)
-                self._write_import_statement(class_name)
+                class_schemas.append((class_name, definition_schemas[definition_key]))
+        return class_schemas
 
-    def _write_import_statement(self, class_name):
-        class_module_name = util.class_name_to_private_module_name(class_name)
-        print(
+    def _get_exported_class_names(self, class_name, class_schema):
+        # a class, and its batch class when ClassGenerator writes one
+        if self.batch_classes and class_schema.get("properties"):
+            return [class_name, class_name + "Batch"]
+        return [class_name]
+
+    def _write_import_statements(self):
+        # the definition classes are generated in the root class file
+        root_class_module_name = util.class_name_to_private_module_name(self.root_class_name)
+        for class_name, class_schema in self._get_class_schemas():
+            for exported_class_name in self._get_exported_class_names(class_name, class_schema):
+                self._write_import_statement(root_class_module_name, exported_class_name)
+
+    def _write_import_statement(self, class_module_name, class_name):
+        self.write_line(
             "from "
             + self.module_name
             + "."
@@ -39,3 +53,36 @@ class InitFileGenerator(PythonFileGenerator):
             + " import "
             + class_name
         )
+
+    def _write_lazy_imports(self):
+        # each class is in a module of its own, imported on first access
+        # through the module's __getattr__ (PEP 562)
+        class_modules = {}
+        for class_name, class_schema in self._get_class_schemas():
+            class_module_name = util.class_name_to_private_module_name(class_name)
+            for exported_class_name in self._get_exported_class_names(class_name, class_schema):
+                class_modules[exported_class_name] = class_module_name
+        self.write_line("import importlib")
+        self.write_line("")
+        self.write_line("__all__ = [")
+        for class_name in class_modules:
+            self.write_line('    "' + class_name + '",')
+        self.write_line("]")
+        self.write_line("")
+        self.write_line("_CLASS_MODULES = {")
+        for class_name, class_module_name in class_modules.items():
+            self.write_line('    "' + class_name + '": ".' + class_module_name + '",')
+        self.write_line("}")
+        self.write_line("")
+        self.write_line("")
+        self.write_line("def __getattr__(name):")
+        self.write_line("    class_module_name = _CLASS_MODULES.get(name)")
+        self.write_line("    if class_module_name is None:")
+        self.write_line('        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))')
+        self.write_line("    value = getattr(importlib.import_module(class_module_name, __name__), name)")
+        self.write_line("    globals()[name] = value")
+        self.write_line("    return value")
+        self.write_line("")
+        self.write_line("")
+        self.write_line("def __dir__():")
+        self.write_line("    return sorted(set(globals()) | set(__all__))")
@@ -0,0 +1,146 @@
+# Picks the fastest available JSON library for parsing and compact encoding.
+#
+# orjson is used when it is installed; otherwise the standard library json module.
+# Set the environment variable JSCHEMA_TO_PYTHON_JSON_BACKEND=json to force the
+# standard library. Indented output (to_json, schema files) always goes through the
+# standard library so that generated files stay byte-for-byte stable.
+#
+# Both backends give the same results. Where orjson differs from the standard library
+# (it reads integers over 64 bits as floats, writes NaN and infinities as null, and
+# doesn't escape non-ASCII characters or write exponents as 1e+16), the input or the
+# output is checked and json is used instead.
+
+import json
+import math
+import os
+import re
+
+JSONDecodeError = json.JSONDecodeError
+
+
+def _json_loads(data):
+    return json.loads(data)
+
+
+def _json_dumps(obj, default=None):
+    return json.dumps(obj, separators=(",", ":"), default=default)
+
+
+def _json_dumps_sorted(obj):
+    return json.dumps(obj, separators=(",", ":"), sort_keys=True)
+
+
+def _select_backend():
+    if os.environ.get("JSCHEMA_TO_PYTHON_JSON_BACKEND", "").lower() == "json":
+        return "json", _json_loads, _json_dumps, _json_dumps_sorted
+
+    try:
+        import orjson
+    except ImportError:
+        return "json", _json_loads, _json_dumps, _json_dumps_sorted
+
+    def _orjson_loads(data):
+        if not _may_have_big_integer(data):
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                # orjson is stricter than the standard library (NaN, Infinity), so let
+                # json decide whether the document is really invalid
+                pass
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+    # json hands dataclasses and datetimes to default, orjson only with these options
+    passthrough = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _orjson_dumps(obj, default=None):
+        try:
+            output = orjson.dumps(obj, default=default, option=passthrough)
+        except TypeError:
+            # e.g. non-string keys or integers over 64 bits
+            return _json_dumps(obj, default)
+        if _differs_from_json(output, obj, default):
+            return _json_dumps(obj, default)
+        return output.decode("utf-8")
+
+    def _orjson_dumps_sorted(obj):
+        try:
+            output = orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | passthrough)
+        except TypeError:
+            return _json_dumps_sorted(obj)
+        if _differs_from_json(output, obj, None):
+            return _json_dumps_sorted(obj)
+        return output.decode("utf-8")
+
+    return "orjson", _orjson_loads, _orjson_dumps, _orjson_dumps_sorted
+
+
+# maps digits to "0" and other bytes to " ", to find runs of digits
+_DIGITS_TO_ZEROS = bytes(0x30 if 0x30 <= byte <= 0x39 else 0x20 for byte in range(256))
+_BIG_INTEGER_DIGITS = b"0" * 19
+_BIG_INTEGER = re.compile(rb"[0-9]{19}")
+
+# maps "0", "." and "e" to themselves, other digits to "1" and anything else to " ", to
+# find the numbers orjson writes differently from json: exponents, which json writes with
+# a sign and two digits (1e+16, 1e-07), and numbers under 1e-4 (0.00002 is 2e-05 in json)
+_NUMBER_CHARACTERS = bytes(
+    byte if byte in b"0.e" else 0x31 if 0x31 <= byte <= 0x39 else 0x20 for byte in range(256)
+)
+
+# the types _has_non_finite_float doesn't need to look into
+_PLAIN_TYPES = {str, int, bool, type(None)}
+
+
+def _may_have_big_integer(data):
+    # whether data has 19 digits in a row, which may be an integer outside of orjson's 64
+    # bits (or a fraction, or part of a string, which json then parses for nothing)
+    if isinstance(data, str):
+        data = data.encode("utf-8", "surrogatepass")
+    elif isinstance(data, memoryview):
+        return _BIG_INTEGER.search(data) is not None
+    return _BIG_INTEGER_DIGITS in data.translate(_DIGITS_TO_ZEROS)
+
+
+def _differs_from_json(output, obj, default):
+    # json escapes non-ASCII characters and DEL
+    if not output.isascii() or b"\x7f" in output:
+        return True
+    numbers = output.translate(_NUMBER_CHARACTERS)
+    if b"0e" in numbers or b"1e" in numbers or b"0.0000" in numbers:
+        return True
+    # NaN and infinities were written as null
+    return b"null" in output and _has_non_finite_float(obj, default)
+
+
+def _has_non_finite_float(value, default):
+    # runs for every output with a null in it, so it doesn't recurse and only looks into
+    # containers; objects the encoder doesn't know are looked into through default, as it does
+    containers = [(value,)]
+    while containers:
+        container = containers.pop()
+        for item in container.values() if isinstance(container, dict) else container:
+            item_type = type(item)
+            if item_type is float:
+                # NaN or an infinity
+                if item - item != 0.0:
+                    return True
+            elif item_type is dict or item_type is list or item_type is tuple:
+                containers.append(item)
+            elif item_type in _PLAIN_TYPES:
+                continue
+            elif isinstance(item, float):
+                if not math.isfinite(item):
+                    return True
+            elif isinstance(item, (dict, list, tuple)):
+                containers.append(item)
+            elif default is not None and not isinstance(item, (str, int)):
+                try:
+                    containers.append((default(item),))
+                except TypeError:
+                    pass
+    return False
+
+
+# dumps_sorted is the compact encoding with sorted keys, for hashing
+BACKEND, loads, dumps, dumps_sorted = _select_backend()
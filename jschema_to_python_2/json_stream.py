@@ -0,0 +1,261 @@
+# Streams the records of a single large JSON document: the elements of its top-level array, or of
+# the array found at a path of object keys, one at a time and in bounded memory.
+#
+# The file is memory-mapped and decoded a window at a time, and the records in a window are parsed
+# by the C scanner of the json module, which also finds where each one ends. Records that straddle
+# two windows, or that aren't valid JSON, are delimited by a scanner that only stops at brackets
+# and braces (strings are skipped by a regular expression), then parsed from a slice of the mapping
+# (a memoryview with orjson, which isn't copied). Pages already read are handed back to the
+# operating system as the scan moves on, so the resident memory depends on the size of the largest
+# record, not of the file.
+
+import json
+import mmap
+import re
+
+from jschema_to_python_2 import json_backend
+
+# bytes decoded at a time
+_WINDOW_BYTES = 1024 * 1024
+
+# pages before the scan position are released once this many bytes have been read past them
+_RELEASE_BYTES = 16 * 1024 * 1024
+
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = re.compile(rb"[^,\]}\s]+")
+# anything up to the next bracket or brace that isn't inside a string, and that bracket or brace;
+# the group is set for opening ones
+_BRACKET = re.compile(rb'(?:[^"\[\]{}]+|"[^"\\]*(?:\\.[^"\\]*)*")*(?:([\[{])|[\]}])', re.DOTALL)
+# what follows an element of an array in a decoded window; the group is empty if it's neither
+_TEXT_SEPARATOR = re.compile(r"[ \t\n\r]*([,\]]?)[ \t\n\r]*")
+
+_DECODER = json.JSONDecoder()
+
+# orjson parses memoryviews without copying them, the json module needs bytes
+_LOADS_MEMORYVIEW = json_backend.BACKEND == "orjson"
+
+
+class JSONStreamError(ValueError):
+    """Raised when the document is not valid JSON or has no array or object at the path."""
+
+
+def parse_json_path(json_path):
+    """Returns the keys of a path such as "$.data.items" or "data.items".
+
+    :param json_path: dot-separated object keys, optionally starting with "$";
+        None or "$" is the top-level value.
+    """
+
+    if not json_path:
+        return ()
+    if json_path.startswith("$"):
+        json_path = json_path[1:].lstrip(".")
+    return tuple(key for key in json_path.split(".") if key)
+
+
+def iter_json_values(file_path, json_path=None, on_invalid=None):
+    """Yields the records of a JSON document one at a time, with their index.
+
+    :param file_path: the path of the JSON file.
+    :param json_path: the object keys leading to the records (see
+        parse_json_path); by default the top-level value.
+    :param on_invalid: called with the index of a record and the error if the
+        record is not valid JSON, which is then skipped; by default the error
+        is raised.
+
+    If the value at json_path is an array, (index, element) pairs are yielded
+    for its elements; if it is an object, (0, object) is. Raises
+    JSONStreamError if the document is malformed outside the records, or has
+    another value at json_path.
+    """
+
+    keys = parse_json_path(json_path)
+    with open(file_path, "rb") as file_obj:
+        try:
+            buffer = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise JSONStreamError("the file is empty") from None
+    try:
+        if hasattr(buffer, "madvise"):
+            buffer.madvise(mmap.MADV_SEQUENTIAL)
+        yield from _Scanner(buffer).iter_values(keys, on_invalid)
+    finally:
+        buffer.close()
+
+
+class _Scanner(object):
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.size = len(buffer)
+        self.released = 0
+
+    def iter_values(self, keys, on_invalid):
+        position = self._skip_whitespace(0)
+        for key in keys:
+            position = self._find_key(position, key)
+        if position >= self.size:
+            raise JSONStreamError("no value at " + _describe_path(keys))
+
+        first = self.buffer[position]
+        if first == ord("{"):
+            end = self._value_end(position)
+            value = self._load(position, end, 0, on_invalid)
+            if value is not _INVALID:
+                yield 0, value
+        elif first == ord("["):
+            yield from self._iter_array(position, on_invalid)
+        else:
+            raise JSONStreamError("the value at " + _describe_path(keys) + " is not an array or object")
+
+    def _iter_array(self, position, on_invalid):
+        index = 0
+        position = self._skip_whitespace(position + 1)
+        if position < self.size and self.buffer[position] == ord("]"):
+            return
+        while True:
+            # position is the start of an element
+            text, final = self._decode_window(position)
+            is_ascii = text.isascii()
+            offset = 0
+            while True:
+                try:
+                    value, end = _DECODER.raw_decode(text, offset)
+                except ValueError:
+                    break
+                separator = _TEXT_SEPARATOR.match(text, end)
+                # a value or separator cut by the end of the window, such as "-25" of "-25.5",
+                # continues after it
+                if not final and (separator.end() >= len(text) or not separator.group(1)):
+                    break
+                if not separator.group(1):
+                    raise JSONStreamError(
+                        "expected ',' or ']' at byte " + str(position + _byte_length(text, end, is_ascii))
+                    )
+                yield index, value
+                index += 1
+                if separator.group(1) == "]":
+                    return
+                offset = separator.end()
+
+            # the element at offset straddles the end of the window or isn't valid JSON
+            position += _byte_length(text, offset, is_ascii)
+            self._release(position)
+            end = self._value_end(position)
+            value = self._load(position, end, index, on_invalid)
+            if value is not _INVALID:
+                yield index, value
+            index += 1
+            position = self._skip_whitespace(end)
+            if position >= self.size:
+                raise JSONStreamError("unexpected end of the document")
+            separator = self.buffer[position]
+            if separator == ord("]"):
+                return
+            if separator != ord(","):
+                raise JSONStreamError("expected ',' or ']' at byte " + str(position))
+            position = self._skip_whitespace(position + 1)
+
+    def _decode_window(self, position):
+        # returns the text of the window at position, and whether it ends the document
+        end = min(position + _WINDOW_BYTES, self.size)
+        with memoryview(self.buffer) as view:
+            try:
+                return str(view[position:end], "utf-8"), end == self.size
+            except UnicodeDecodeError as error:
+                # a character split by the end of the window, or invalid UTF-8, which is left to
+                # _load to report
+                return str(view[position : position + error.start], "utf-8"), False
+
+    def _find_key(self, position, key):
+        # returns the position of the value of key in the object at position
+        if position >= self.size or self.buffer[position] != ord("{"):
+            raise JSONStreamError("expected an object at byte " + str(position))
+        position = self._skip_whitespace(position + 1)
+        while position < self.size and self.buffer[position] != ord("}"):
+            match = _STRING.match(self.buffer, position)
+            if not match:
+                raise JSONStreamError("expected a key at byte " + str(position))
+            name = json_backend.loads(match.group())
+            position = self._skip_whitespace(match.end())
+            if position >= self.size or self.buffer[position] != ord(":"):
+                raise JSONStreamError("expected ':' at byte " + str(position))
+            position = self._skip_whitespace(position + 1)
+            if name == key:
+                return position
+            position = self._value_end(position)
+            self._release(position)
+            position = self._skip_whitespace(position)
+            if position < self.size and self.buffer[position] == ord(","):
+                position = self._skip_whitespace(position + 1)
+        raise JSONStreamError("no key " + repr(key) + " in the object")
+
+    def _value_end(self, position):
+        if position >= self.size:
+            raise JSONStreamError("unexpected end of the document")
+        first = self.buffer[position]
+        if first == ord('"'):
+            match = _STRING.match(self.buffer, position)
+            if not match:
+                raise JSONStreamError("unterminated string at byte " + str(position))
+            return match.end()
+        if first != ord("{") and first != ord("["):
+            match = _SCALAR.match(self.buffer, position)
+            if not match:
+                raise JSONStreamError("expected a value at byte " + str(position))
+            return match.end()
+
+        depth = 0
+        for match in _BRACKET.finditer(self.buffer, position):
+            if match.lastindex:
+                depth += 1
+            else:
+                depth -= 1
+                if not depth:
+                    return match.end()
+        raise JSONStreamError("unexpected end of the document")
+
+    def _skip_whitespace(self, position):
+        return _WHITESPACE.match(self.buffer, position).end()
+
+    def _load(self, start, end, index, on_invalid):
+        if _LOADS_MEMORYVIEW:
+            with memoryview(self.buffer) as view:
+                data = view[start:end]
+                try:
+                    return json_backend.loads(data)
+                except (ValueError, TypeError):
+                    # orjson's errors are retried by the json module, which needs bytes
+                    pass
+                finally:
+                    data.release()
+        try:
+            return json_backend.loads(self.buffer[start:end])
+        except ValueError as error:
+            if on_invalid is None:
+                raise JSONStreamError("record " + str(index) + " is not valid JSON: " + str(error)) from None
+            on_invalid(index, error)
+            return _INVALID
+
+    def _release(self, position):
+        # drops the pages that were read from the process's resident memory; they are read
+        # from the file again if needed
+        if position - self.released < _RELEASE_BYTES or not hasattr(self.buffer, "madvise"):
+            return
+        end = position - position % mmap.PAGESIZE
+        self.buffer.madvise(mmap.MADV_DONTNEED, self.released, end - self.released)
+        self.released = end
+
+
+_INVALID = object()
+
+
+def _byte_length(text, offset, is_ascii):
+    # the number of bytes of the first offset characters of a decoded window
+    if is_ascii:
+        return offset
+    return len(text[:offset].encode("utf-8"))
+
+
+def _describe_path(keys):
+    return "$" + "".join("." + key for key in keys)
@@ -0,0 +1,122 @@
+from jschema_to_python_2 import json_backend
+
+_MISSING = object()
+
+
+class LazyRecord(object):
+    """Base class of the classes generated with --lazy.
+
+    An instance wraps the raw JSON document, either the encoded text (str or
+    bytes) or the parsed dict. The text is only parsed when a property is
+    first read, and each property value (including nested generated objects)
+    is only built on its first read, then cached. Properties are declared
+    with lazy_property.
+
+    Assigned properties are written back to the document (which is copied
+    first if it belongs to the caller), so to_dict() returns the original
+    document with only the touched values replaced.
+    """
+
+    __slots__ = ("_raw", "_cache", "_owns_raw")
+
+    # set by classes generated with --frozen
+    _frozen = False
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._cache = {}
+        self._owns_raw = False
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d)
+
+    @classmethod
+    def from_json(cls, s):
+        # parsed on first access
+        return cls(s)
+
+    def _decoded(self):
+        raw = self._raw
+        if type(raw) is not dict:
+            raw = self._raw = json_backend.loads(raw)
+            self._owns_raw = True
+        return raw
+
+    def to_dict(self):
+        raw = self._decoded()
+        if not self._cache:
+            return raw
+        # values built from the document (e.g. nested objects) may have been
+        # modified since, so they replace the parsed ones; defaults of missing
+        # or null properties are left out unless they were filled in
+        result = dict(raw)
+        for key, value in self._cache.items():
+            if value or result.get(key) is not None:
+                result[key] = value
+        return result
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return self.__class__.__name__ + "(" + repr(self.to_dict()) + ")"
+
+
+class lazy_property(object):
+    """A property of a LazyRecord, read from the document key schema_property_name.
+
+    converter builds the value from the parsed JSON (e.g. a nested generated
+    class's from_dict). When the key is missing or null, the property is
+    default, or a new factory() if a factory is given.
+    """
+
+    __slots__ = ("schema_property_name", "converter", "default", "factory")
+
+    def __init__(self, schema_property_name, converter=None, default=None, factory=None):
+        self.schema_property_name = schema_property_name
+        self.converter = converter
+        self.default = default
+        self.factory = factory
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        cache = obj._cache
+        name = self.schema_property_name
+        value = cache.get(name, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        value = obj._decoded().get(name)
+        if value is None:
+            if self.factory is None:
+                return self.default
+            value = self.factory()
+        elif self.converter is not None:
+            value = self.converter(value)
+        else:
+            # plain JSON values are returned as they are, no need to cache them
+            return value
+        cache[name] = value
+        return value
+
+    def __set__(self, obj, value):
+        if obj._frozen:
+            raise AttributeError("can't set attribute of a frozen instance")
+        raw = obj._decoded()
+        if not obj._owns_raw:
+            raw = obj._raw = dict(raw)
+            obj._owns_raw = True
+        raw[self.schema_property_name] = value
+        obj._cache[self.schema_property_name] = value
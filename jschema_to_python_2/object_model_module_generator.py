@@ -1,79 +1,181 @@
 import os
 
+from jschema_to_python_2 import json_backend
 import jschema_to_python_2.utilities as util
 from jschema_to_python_2.init_file_generator import InitFileGenerator
 from jschema_to_python_2.class_generator import ClassGenerator
 from jschema_to_python_2.subclass_generator import SubclassGenerator
+from jschema_to_python_2.profiler import PhaseProfiler
 
 
 class ObjectModelModuleGenerator:
-    def __init__(self, args):
+    def __init__(self, args, root_schema=None, code_gen_hints=None, profiler=None, render_cache=None):
+        # root_schema and code_gen_hints, if given, are used instead of reading
+        # args.schema_path and args.hints_file_path. render_cache, if given, is a
+        # dict that keeps the source of each class between generators, so that
+        # only the classes whose schema changed are rendered again (the code
+        # generation hints must stay the same)
+        self.profiler = profiler or PhaseProfiler()
         self.output_directory = args.output_directory
         self.force = args.force
         self.module_name = args.module_name
-        self.root_schema = self.read_schema(args.schema_path)
-        self.code_gen_hints = self.read_code_gen_hints(args.hints_file_path)
+        with self.profiler.phase("read_schema"):
+            if root_schema is None:
+                root_schema = self.read_schema(args.schema_path)
+            if code_gen_hints is None:
+                code_gen_hints = self.read_code_gen_hints(args.hints_file_path)
+        self.root_schema = root_schema
+        self.code_gen_hints = code_gen_hints
         self.root_class_name = args.root_class_name
+        # code generation options added after args was first defined are read with
+        # defaults, so that callers building their own args keep working
+        self.slots = getattr(args, "slots", False)
+        self.frozen = getattr(args, "frozen", False)
+        self.batch_classes = getattr(args, "batch_classes", False)
+        self.lazy = getattr(args, "lazy", False)
+        self.validators = getattr(args, "validators", False)
+        self.split_modules = getattr(args, "split_modules", False)
+        self.enum_converters = getattr(args, "enum_converters", None)
+        self.render_cache = render_cache
+        self.rendered_class_names = []
         self.subclass_defs = ""
 
     def generate(self):
-        util.create_directory(self.output_directory, self.force)
-        self.generate_definition_classes()
-        self.generate_root_class()
-        self.generate_init_file()
+        # returns the names of the files written or removed; files whose
+        # source didn't change are left alone
+        sources = self.render()
+        with self.profiler.phase("write_files"):
+            util.create_directory(self.output_directory, self.force)
+            changed_file_names = []
+            for file_name, source in sources.items():
+                if not util.write_file_if_changed(os.path.join(self.output_directory, file_name), source):
+                    self.profiler.count("files_unchanged")
+                    continue
+                changed_file_names.append(file_name)
+                self.profiler.count("files_written")
+                self.profiler.count("bytes_written", len(source))
+            # only once the new files are in place, so the module is never missing a file
+            for file_name in util.remove_stale_files(self.output_directory, sources):
+                changed_file_names.append(file_name)
+                self.profiler.count("files_removed")
+        return changed_file_names
+
+    def render(self):
+        # returns the generated source of each file in the module, by file name,
+        # without any disk I/O
+        self.rendered_class_names = []
+        self._used_render_cache_keys = set()
+        sources = {}
+        if self.split_modules:
+            sources.update(self.generate_definition_modules())
+        else:
+            self.generate_definition_classes()
+        sources.update(self.generate_root_class())
+        sources.update(self.generate_init_file())
+        if self.render_cache is not None:
+            # drop the classes that are gone from the schema
+            for key in self.render_cache.keys() - self._used_render_cache_keys:
+                del self.render_cache[key]
+        return sources
 
     def generate_init_file(self):
-        init_file_generator = InitFileGenerator(
-            self.module_name,
-            self.root_schema,
-            self.root_class_name,
-            self.output_directory,
-        )
-        init_file_generator.generate()
+        with self.profiler.phase("generate_init_file"):
+            init_file_generator = InitFileGenerator(
+                self.module_name,
+                self.root_schema,
+                self.root_class_name,
+                self.output_directory,
+                self.split_modules,
+                self.batch_classes,
+            )
+            return {"__init__.py": init_file_generator.render()}
 
     def generate_root_class(self):
-        class_generator = ClassGenerator(
-            self.root_schema,
-            self.root_class_name,
-            self.code_gen_hints,
-            self.output_directory,
-        )
-        class_generator.generate()
+        file_name = util.class_name_to_private_module_name(self.root_class_name) + ".py"
+        source = self.render_class(ClassGenerator, self.root_schema, self.root_class_name)
+        # subclass definitions go in the root class file, unless split_modules
+        return {file_name: source + self.subclass_defs}
+
+    def get_definition_schemas(self):
+        definition_schemas = self.root_schema.get("definitions")
+        if not definition_schemas:
+            definition_schemas = self.root_schema.get("$defs")
+        return definition_schemas or {}
 
-        root_class_path = class_generator.file_path
-        # append subclass definitions to root class file
-        with open(root_class_path, "a") as root_class_file:
-            root_class_file.write(self.subclass_defs)
+    def generate_definition_modules(self):
+        # one module per definition class, with --split-modules
+        sources = {}
+        definition_schemas = self.get_definition_schemas()
+        for key in definition_schemas:
+            class_name = util.capitalize_first_letter(key)
+            file_name = util.class_name_to_private_module_name(class_name) + ".py"
+            sources[file_name] = self.render_class(ClassGenerator, definition_schemas[key], class_name)
+        return sources
 
     def generate_definition_classes(self):
-        definition_schemas = self.root_schema.get("definitions")
-        subdefinitions = ""
+        definition_schemas = self.get_definition_schemas()
+        # joined once at the end, as repeated concatenation is quadratic with many definitions
+        subdefinitions = []
         if definition_schemas:
             for key in definition_schemas:
-                subdefinitions += self.generate_definition_class(key, definition_schemas[key])
-        else:
-            definition_schemas = self.root_schema.get("$defs")
-            if definition_schemas:
-                for key in definition_schemas:
-                    subdefinitions += self.generate_definition_class(key, definition_schemas[key])
-        
-        if subdefinitions != "":
-            subdefinitions = "\n" + subdefinitions
-            self.subclass_defs = subdefinitions
+                subdefinitions.append(self.generate_definition_class(key, definition_schemas[key]))
+
+        if subdefinitions:
+            self.subclass_defs = "\n" + "".join(subdefinitions)
 
     def generate_definition_class(self, definition_key, definition_schema):
         class_name = util.capitalize_first_letter(definition_key)
-        class_generator = SubclassGenerator(
-            definition_schema, class_name, self.code_gen_hints, self.output_directory
+        return self.render_class(SubclassGenerator, definition_schema, class_name)
+
+    def render_class(self, generator_class, class_schema, class_name):
+        cache_key = None
+        if self.render_cache is not None:
+            cache_key = (
+                generator_class.__name__,
+                class_name,
+                self.slots,
+                self.frozen,
+                self.batch_classes,
+                self.lazy,
+                self.validators,
+                self.split_modules and self.module_name,
+                self.enum_converters,
+                json_backend.dumps_sorted(_without_definitions(class_schema)),
+            )
+            self._used_render_cache_keys.add(cache_key)
+            source = self.render_cache.get(cache_key)
+            if source is not None:
+                self.profiler.count("classes_reused")
+                return source
+
+        class_generator = generator_class(
+            class_schema,
+            class_name,
+            self.code_gen_hints,
+            self.output_directory,
+            self.slots,
+            self.frozen,
+            self.batch_classes,
+            self.lazy,
+            self.validators,
+            self.module_name if self.split_modules else None,
+            self.enum_converters,
         )
-        class_generator.generate()
-        return class_generator.generated_string
+        with self.profiler.phase("generate_class", class_name):
+            source = class_generator.render()
+        self.profiler.count("classes_emitted")
+        self.profiler.count("attributes_emitted", len(class_schema.get("properties") or ()))
+        self.rendered_class_names.append(class_name)
+        if cache_key is not None:
+            self.render_cache[cache_key] = source
+        return source
 
     def read_schema(self, schema_path):
         if not os.path.exists(schema_path):
             util.exit_with_error("schema file {} does not exist", schema_path)
 
-        return util.unpickle_file(schema_path)
+        self.profiler.count("bytes_parsed", os.path.getsize(schema_path))
+        return util.read_json_file(schema_path)
 
     def read_code_gen_hints(self, hints_file_path):
         if not hints_file_path:
@@ -84,4 +186,11 @@ class ObjectModelModuleGenerator:
                 "code generation hints file {} does not exist", hints_file_path
             )
 
-        return util.unpickle_file(hints_file_path)
+        return util.read_json_file(hints_file_path)
+
+
+def _without_definitions(class_schema):
+    # the root class doesn't depend on the definitions, which are rendered as classes of their own
+    if "definitions" not in class_schema and "$defs" not in class_schema:
+        return class_schema
+    return {key: value for key, value in class_schema.items() if key != "definitions" and key != "$defs"}
@@ -0,0 +1,175 @@
+import collections
+import contextlib
+import cProfile
+import json
+import time
+import tracemalloc
+
+# number of slowest items kept per phase (e.g. the slowest classes to generate)
+_SLOWEST_ITEMS = 10
+
+
+class PhaseProfiler(object):
+    """Records wall time, CPU time and peak traced memory for each phase of a run.
+
+    A phase is timed with "with profiler.phase(name):"; a phase entered several
+    times (e.g. once per generated class) is accumulated, and the slowest items
+    are kept when an item is given. Counters are incremented with count().
+
+    A disabled profiler (the default) only keeps the counters, and its phase()
+    and iterate() cost next to nothing, so the code being profiled doesn't need
+    to check whether profiling is on. With a cprofile_path, each top-level phase
+    also runs under cProfile, and the statistics of the slowest one are dumped
+    there by write_report().
+    """
+
+    def __init__(self, enabled=False, cprofile_path=None):
+        self.enabled = enabled
+        self.cprofile_path = cprofile_path if enabled else None
+        self.counters = collections.Counter()
+        self._phases = collections.OrderedDict()
+        self._stack = []
+        self._profiles = {}
+        # phases reset tracemalloc's peak, so the peak of the whole run is tracked here
+        self._peak = 0
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.process_time()
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def phase(self, name, item=None):
+        if not self.enabled:
+            return contextlib.nullcontext()
+        return self._profile_phase(name, item)
+
+    @contextlib.contextmanager
+    def _profile_phase(self, name, item):
+        if self._stack:
+            # the enclosing phase's peak so far, before resetting it for this one
+            self._stack[-1]["peak"] = max(self._stack[-1]["peak"], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        frame = {"peak": 0}
+        profile = None
+        if self.cprofile_path and not self._stack:
+            # only one cProfile can be active at a time, so nested phases aren't profiled
+            profile = self._profiles.get(name)
+            if profile is None:
+                profile = self._profiles[name] = cProfile.Profile()
+            profile.enable()
+        self._stack.append(frame)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.process_time() - start_cpu
+            if profile is not None:
+                profile.disable()
+            self._stack.pop()
+            peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+            self._add(name, wall, cpu, peak, item)
+
+    def iterate(self, name, iterable):
+        """Yields from iterable, accumulating the time spent producing the items as phase name.
+
+        Only wall and CPU time are recorded, not memory.
+        """
+
+        if not self.enabled:
+            return iterable
+        return self._iterate(name, iterable)
+
+    def _iterate(self, name, iterable):
+        iterator = iter(iterable)
+        wall = 0.0
+        cpu = 0.0
+        try:
+            while True:
+                start_wall = time.perf_counter()
+                start_cpu = time.process_time()
+                try:
+                    item = next(iterator)
+                finally:
+                    wall += time.perf_counter() - start_wall
+                    cpu += time.process_time() - start_cpu
+                yield item
+        except StopIteration:
+            return
+        finally:
+            self._add(name, wall, cpu, None, None)
+
+    def _add(self, name, wall, cpu, peak, item):
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = {
+                "calls": 0,
+                "wall_seconds": 0.0,
+                "cpu_seconds": 0.0,
+                "peak_memory_bytes": None,
+                "slowest": [],
+            }
+        phase["calls"] += 1
+        phase["wall_seconds"] += wall
+        phase["cpu_seconds"] += cpu
+        if peak is not None:
+            phase["peak_memory_bytes"] = max(phase["peak_memory_bytes"] or 0, peak)
+            self._peak = max(self._peak, peak)
+        if item is not None:
+            slowest = phase["slowest"]
+            slowest.append((wall, item))
+            if len(slowest) > _SLOWEST_ITEMS:
+                slowest.sort(reverse=True)
+                del slowest[_SLOWEST_ITEMS:]
+
+    def report(self):
+        phases = collections.OrderedDict()
+        for name, phase in self._phases.items():
+            phases[name] = {
+                "calls": phase["calls"],
+                "wall_seconds": round(phase["wall_seconds"], 6),
+                "cpu_seconds": round(phase["cpu_seconds"], 6),
+                "peak_memory_bytes": phase["peak_memory_bytes"],
+            }
+            if phase["slowest"]:
+                phases[name]["slowest"] = [
+                    {"item": item, "wall_seconds": round(wall, 6)}
+                    for wall, item in sorted(phase["slowest"], reverse=True)
+                ]
+
+        peak = None
+        if tracemalloc.is_tracing():
+            peak = max(self._peak, tracemalloc.get_traced_memory()[1])
+        report = {
+            "total": {
+                "wall_seconds": round(time.perf_counter() - self._start_wall, 6),
+                "cpu_seconds": round(time.process_time() - self._start_cpu, 6),
+                "peak_memory_bytes": peak,
+            },
+            "phases": phases,
+            "counters": dict(sorted(self.counters.items())),
+        }
+        hottest_phase = self._get_hottest_profiled_phase()
+        if hottest_phase:
+            report["cprofile"] = {"phase": hottest_phase, "path": str(self.cprofile_path)}
+        return report
+
+    def _get_hottest_profiled_phase(self):
+        if not self._profiles:
+            return None
+        return max(self._profiles, key=lambda name: self._phases[name]["wall_seconds"])
+
+    def write_report(self, path):
+        report = self.report()
+        with open(path, "w") as report_file:
+            report_file.write(json.dumps(report, indent=2))
+        hottest_phase = self._get_hottest_profiled_phase()
+        if hottest_phase:
+            # load with pstats.Stats(path), or a viewer such as snakeviz
+            self._profiles[hottest_phase].dump_stats(self.cprofile_path)
+        return report
@@ -1,14 +1,31 @@
 import os
 
 from jschema_to_python_2 import __version__
+import jschema_to_python_2.utilities as util
 
 
 class PythonFileGenerator(object):
     def __init__(self, output_directory):
         self.output_directory = output_directory
+        self.lines = []
+
+    def write_line(self, line=""):
+        self.lines.append(line)
+
+    def render(self):
+        # the generated source, built in memory; nothing is written to disk
+        self.lines = []
+        self.write_source()
+        return "\n".join(self.lines) + "\n"
+
+    def write_source(self):
+        raise NotImplementedError
+
+    def write_file(self, file_path, source):
+        util.write_file_if_changed(file_path, source)
 
     def write_generation_comment(self):
-        print(
+        self.write_line(
             "# This file was generated by "
             + __package__
             + " - lkekana version.\n"
@@ -4,12 +4,22 @@
 import attr
 import copy
 import json
+import weakref
 
+from jschema_to_python_2 import json_backend
+from jschema_to_python_2.lazy import LazyRecord
 
-def to_json(obj):
+
+# Chunks produced by iterencode are tiny; they are gathered up to this many characters
+# before each write, so streaming doesn't cost one write call per token.
+_WRITE_BUFFER_SIZE = 64 * 1024
+
+
+def to_json(obj, indent=2):
     """''Serializes an instance of a generated class to JSON.
 
     :param obj: an instance of any class generated by jschema-to-python.
+    :param indent: the indentation level, or None for compact output.
 
     Before serializing the instance to JSON, this function maps the Python
     property names to the corresponding JSON schema property names. It also
@@ -17,16 +27,167 @@ def to_json(obj):
     making the resulting JSON smaller.
     """
 
-    return json.dumps(obj, indent=2, default=_generated_class_serializer)
+    return _make_encoder(indent).encode(obj)
+
+
+def iter_json(obj, indent=2):
+    """Serializes an instance of a generated class to JSON incrementally.
+
+    :param obj: an instance of any class generated by jschema-to-python.
+    :param indent: the indentation level, or None for compact output.
+
+    Yields the JSON text in chunks, as json.JSONEncoder.iterencode does, so
+    the whole document never has to be held in memory.
+    """
+
+    return _make_encoder(indent).iterencode(obj)
+
+
+def write_json(obj, fp, indent=2):
+    """Serializes an instance of a generated class to JSON and writes it to fp.
+
+    :param obj: an instance of any class generated by jschema-to-python.
+    :param fp: a text file-like object with a write method, e.g. an open
+        file or socket.makefile("w").
+    :param indent: the indentation level, or None for compact output.
+
+    The output is the same as to_json(obj, indent), but it is written in
+    bounded chunks as it is produced.
+    """
+
+    buffer = []
+    buffered = 0
+    for chunk in iter_json(obj, indent):
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= _WRITE_BUFFER_SIZE:
+            fp.write("".join(buffer))
+            buffer = []
+            buffered = 0
+    if buffer:
+        fp.write("".join(buffer))
+
+
+def to_json_lines(iterable, fp):
+    """Writes instances of generated classes to fp as JSON Lines.
+
+    :param iterable: instances of any classes generated by jschema-to-python.
+    :param fp: a text file-like object with a write method.
+
+    Each instance is written as one line of compact JSON, so memory use
+    depends only on the size of a single instance. The lines are encoded by
+    the fastest available JSON backend (see json_backend).
+    """
+
+    dumps = json_backend.dumps
+    for obj in iterable:
+        fp.write(dumps(obj, default=_generated_class_serializer) + "\n")
+
+
+def _make_encoder(indent):
+    # compact output drops the spaces after separators as well
+    separators = (",", ":") if indent is None else None
+    return json.JSONEncoder(
+        indent=indent, separators=separators, default=_generated_class_serializer
+    )
+
+
+# Serialization plans, computed once per generated class. Weak keys, so classes built at
+# runtime can still be garbage collected.
+_serialization_plans = weakref.WeakKeyDictionary()
+
+# A field whose value is the default is left out of the JSON.
+_NO_DEFAULT = object()
+_CALL_FACTORY = object()
 
 
 def _generated_class_serializer(obj):
+    cls = obj.__class__
+    plan = _serialization_plans.get(cls)
+    if plan is None:
+        if not attr.has(cls):
+            if isinstance(obj, LazyRecord):
+                # the wrapped document, with only the touched properties rebuilt
+                return obj.to_dict()
+            return _reflective_serializer(obj)
+        plan = _make_serialization_plan(cls)
+        _serialization_plans[cls] = plan
+
+    field_names, entries = plan
+    if entries is None:
+        return _reflective_serializer(obj)
+
+    obj_dict = getattr(obj, "__dict__", None)
+    if obj_dict is None:
+        values = [getattr(obj, name) for name in field_names]
+    elif list(obj_dict) == field_names:
+        values = list(obj_dict.values())
+    else:
+        # extra or reordered instance attributes: keep the exact reflective output
+        return _reflective_serializer(obj)
+
+    result = {}
+    for index, output_name, default, factory in entries:
+        value = values[index]
+        if default is not _NO_DEFAULT:
+            if default is _CALL_FACTORY:
+                if value == factory():
+                    continue
+            elif value == default:
+                continue
+        result[output_name] = value
+    return result
+
+
+# Precomputes, for each field, where its value is, the JSON property name and the default to
+# compare against. The entries are ordered the way the reflective serializer leaves the keys:
+# fields that keep their name in declaration order, then the renamed ones.
+def _make_serialization_plan(cls):
+    fields = attr.fields(cls)
+    field_names = [field.name for field in fields]
+    kept_entries = []
+    renamed_entries = []
+    for index, field in enumerate(fields):
+        factory = None
+        if type(field.default) == attr._make.Factory:
+            factory = field.default.factory
+            if factory is list or factory is dict:
+                # the value of these factories is always the same, compare against it directly
+                default = factory()
+            else:
+                default = _CALL_FACTORY
+        elif field.default is attr.NOTHING:
+            default = _NO_DEFAULT
+        else:
+            default = field.default
+
+        schema_property_name = field.metadata.get("schema_property_name")
+        if schema_property_name and schema_property_name != field.name:
+            if schema_property_name in field_names:
+                # renaming onto another field's name depends on the values, don't plan it
+                return field_names, None
+            renamed_entries.append((index, schema_property_name, default, factory))
+        else:
+            kept_entries.append((index, field.name, default, factory))
+
+    return field_names, tuple(kept_entries + renamed_entries)
+
+
+def _reflective_serializer(obj):
     if hasattr(obj, "__dict__"):
         dict = getattr(obj, "__dict__")
         dict = copy.deepcopy(dict)
         _remove_properties_with_default_values(obj, dict)
         _change_python_property_names_to_schema_property_names(obj, dict)
         return dict
+    elif attr.has(obj.__class__):
+        # slotted classes have no __dict__, so collect the attribute values instead
+        dict = {
+            field.name: getattr(obj, field.name) for field in attr.fields(obj.__class__)
+        }
+        _remove_properties_with_default_values(obj, dict)
+        _change_python_property_names_to_schema_property_names(obj, dict)
+        return dict
     else:
         return str(obj)
 
@@ -1,8 +1,9 @@
+import json
 import os
-import shutil
 import sys
 import jsonpickle
 import re
+from jschema_to_python_2 import json_backend
 
 _TYPE_MAPPING = {
     "string": "str",
@@ -51,16 +52,350 @@ def capitalize_first_letter(identifier):
     return identifier[0].capitalize() + identifier[1:]
 
 
+def ref_to_class_name(ref):
+    # "#/$defs/Job" and "#/definitions/Job" both refer to the generated class Job
+    return capitalize_first_letter(ref.rsplit("/", 1)[-1])
+
+
+# Returns an expression that turns the parsed JSON value of a property into generated
+# class instances, or None if the value can be used as it is. enum_converter, if given,
+# is the function applied to the values of a property with an enum (or to the items of an
+# array of them), see get_property_enum_values.
+def make_from_dict_converter(property_schema, value_expression, enum_converter=None):
+    ref = property_schema.get("$ref")
+    if ref:
+        return ref_to_class_name(ref) + ".from_dict(" + value_expression + ")"
+
+    if enum_converter:
+        if property_schema.get("type") == "array":
+            return "[" + enum_converter + "(item) for item in " + value_expression + "]"
+        return enum_converter + "(" + value_expression + ")"
+
+    if property_schema.get("type") == "array":
+        items_schema = property_schema.get("items")
+        if isinstance(items_schema, dict) and items_schema.get("$ref"):
+            class_name = ref_to_class_name(items_schema["$ref"])
+            return "[" + class_name + ".from_dict(item) for item in " + value_expression + "]"
+
+    return None
+
+
+def make_class_decorator(slots=False, frozen=False):
+    # slotted classes have no per-instance __dict__; frozen ones are hashable (their array and
+    # object fields are left out of the hash, see is_hashable_property). Slotted frozen ones
+    # cache the hash: without slots, attrs would keep it in the instance __dict__, where
+    # to_json would take it for a property
+    decorator_args = []
+    if slots:
+        decorator_args.append("slots=True")
+    if frozen:
+        decorator_args.append("frozen=True")
+        if slots:
+            decorator_args.append("cache_hash=True")
+    if not decorator_args:
+        return "@attr.s"
+    return "@attr.s(" + ", ".join(decorator_args) + ")"
+
+
+# the JSON types whose parsed values are hashable
+_HASHABLE_TYPES = {"string", "integer", "number", "boolean", "null"}
+
+
+# Returns whether the values of a property are hashable: scalars, or instances of the
+# generated classes. Arrays and objects are parsed as lists and dicts, so the fields of
+# other properties are declared with hash=False in frozen classes.
+def is_hashable_property(property_schema):
+    if property_schema.get("$ref"):
+        return True
+    type_names = property_schema.get("type")
+    if isinstance(type_names, str):
+        type_names = [type_names]
+    return isinstance(type_names, list) and bool(type_names) and set(type_names) <= _HASHABLE_TYPES
+
+
+# Returns the factory (list or dict) of the attributes of array and object properties, or None.
+def get_property_factory(property_schema):
+    property_type = property_schema.get("type")
+    if property_type == "array":
+        return list
+    if property_type == "object":
+        return dict
+    return None
+
+
+# Returns the names of the properties declared before the optional ones: the required
+# properties, sorted, and then the arrays and objects, which have factories.
+def order_required_property_names(class_schema):
+    required_property_names = sorted(class_schema.get("required") or ())
+    if required_property_names:
+        # if any required properties are arrays or objects, we can move them to the end of the list
+        # this is because the factory functions for these types will not work if the property is not already defined
+        for property_name in required_property_names:
+            if get_property_factory(class_schema["properties"][property_name]):
+                required_property_names.remove(property_name)
+                required_property_names.append(property_name)
+
+        # find array or object items in schema (that are not in the required list) and add them to it
+        # these must also be added after mandatory/required items for their factory to work
+        for property_name in class_schema["properties"]:
+            if get_property_factory(class_schema["properties"][property_name]):
+                if property_name not in required_property_names:
+                    required_property_names.append(property_name)
+    return required_property_names
+
+
+# Returns the names of the properties in the order they are declared, as attrs requires
+# that mandatory attributes be declared before optional attributes.
+def order_property_names(class_schema, required_property_names):
+    property_schemas = class_schema.get("properties")
+    if not property_schemas:
+        return []
+    ordered_property_names = list(required_property_names)
+    for schema_property_name in sorted(property_schemas.keys()):
+        if schema_property_name not in required_property_names:
+            ordered_property_names.append(schema_property_name)
+    return ordered_property_names
+
+
+def make_lazy_property(schema_property_name, property_schema, default, enum_converter=None):
+    # the right-hand side of a property declaration in a class generated with --lazy
+    arguments = ['"' + schema_property_name + '"']
+    converted_value = make_from_dict_converter(property_schema, "value", enum_converter)
+    if converted_value:
+        arguments.append("converter=lambda value: " + converted_value)
+    property_type = property_schema.get("type")
+    if property_type == "array":
+        arguments.append("factory=list")
+    elif property_type == "object":
+        arguments.append("factory=dict")
+    elif default != "None":
+        arguments.append("default=" + default)
+    return "lazy_property(" + ", ".join(arguments) + ")"
+
+
+def get_string_enum_values(schema):
+    # the strings of the "enum" of a string, or nullable string, schema; None if
+    # it has no enum, or isn't one of those
+    type_names = schema.get("type")
+    if isinstance(type_names, str):
+        type_names = [type_names]
+    if not isinstance(type_names, list) or "string" not in type_names or not set(type_names) <= {"string", "null"}:
+        return None
+    values = [value for value in schema.get("enum") or () if value is not None]
+    if not values or not all(isinstance(value, str) for value in values):
+        return None
+    return values
+
+
+def get_property_enum_values(property_schema):
+    # the enum values of a string property, or of the items of an array property
+    if property_schema.get("type") == "array":
+        items_schema = property_schema.get("items")
+        return get_string_enum_values(items_schema) if isinstance(items_schema, dict) else None
+    return get_string_enum_values(property_schema)
+
+
+_ENUM_MEMBER_WORD_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+def make_enum_member_names(values):
+    # upper case names for the members of a generated enum, by value, e.g.
+    # "JobStarted" -> JOB_STARTED and "in-progress" -> IN_PROGRESS
+    names = {}
+    used_names = set()
+    for value in values:
+        name = _ENUM_MEMBER_WORD_BOUNDARY.sub("_", value)
+        name = "_".join(part for part in _INVALID_NAME_CHARACTERS.sub("_", name).split("_") if part).upper()
+        if not name:
+            name = "EMPTY"
+        elif name[0].isdigit():
+            name = "VALUE_" + name
+        unique_name = name
+        number = 2
+        while unique_name in used_names:
+            unique_name = name + "_" + str(number)
+            number += 1
+        used_names.add(unique_name)
+        names[value] = unique_name
+    return names
+
+
+def make_batch_column_type(property_schema):
+    # scalar columns are stored in typed arrays or interned string lists by
+    # ColumnarBatch, anything else is kept as the parsed JSON values
+    property_type = property_schema.get("type")
+    if type(property_type) == str and property_type in _TYPE_MAPPING:
+        return '"' + property_type + '"'
+    return "None"
+
+
+def collect_referenced_class_names(schema, class_names):
+    # adds the classes referred to by schema, its array items and the
+    # properties of its inline objects to the set class_names
+    if not isinstance(schema, dict):
+        return
+    ref = schema.get("$ref")
+    if ref:
+        class_names.add(ref_to_class_name(ref))
+        return
+    collect_referenced_class_names(schema.get("items"), class_names)
+    for property_schema in (schema.get("properties") or {}).values():
+        collect_referenced_class_names(property_schema, class_names)
+
+
+# Python conditions that are true when the value named by {0} does NOT have
+# the JSON type; as in JSON Schema, integers are numbers, floats with no
+# fractional part are integers, and booleans are neither
+_INVALID_TYPE_CONDITIONS = {
+    "string": "type({0}) is not str",
+    "integer": "type({0}) is not int and not (type({0}) is float and {0}.is_integer())",
+    "number": "type({0}) is not float and type({0}) is not int",
+    "boolean": "type({0}) is not bool",
+    "null": "{0} is not None",
+    "array": "type({0}) is not list",
+    "object": "type({0}) is not dict",
+}
+
+
+def make_validation_lines(schema, value, path, depth=0, is_class_schema=False):
+    """Returns the lines of Python code that check a value against a schema.
+
+    :param schema: the schema of the value.
+    :param value: the name of the variable that holds the value.
+    :param path: an expression that evaluates to the path of the value.
+    :param depth: the nesting depth, which keeps variable names apart.
+    :param is_class_schema: whether schema is the schema of the class being
+        generated, whose $refs are not followed.
+
+    The lines are not indented, except relative to each other. Only the type,
+    required, properties, items and $ref keywords are checked; they raise
+    ValidationError with the path of the first invalid value.
+    """
+
+    ref = schema.get("$ref")
+    if ref and not is_class_schema:
+        return [ref_to_class_name(ref) + ".validate(" + value + ", " + path + ")"]
+
+    lines = []
+    type_names = schema.get("type")
+    if isinstance(type_names, str):
+        type_names = [type_names]
+    if (
+        isinstance(type_names, list)
+        and type_names
+        and all(type_name in _INVALID_TYPE_CONDITIONS for type_name in type_names)
+    ):
+        condition = " and ".join(_INVALID_TYPE_CONDITIONS[type_name].format(value) for type_name in type_names)
+        expected = " or ".join(type_names)
+        lines.append("if " + condition + ":")
+        lines.append(
+            "    raise ValidationError(" + path + ', "expected ' + expected + ', got " + json_type_name(' + value + "))"
+        )
+    else:
+        type_names = None
+
+    if schema.get("properties") or schema.get("required"):
+        object_lines = _make_object_validation_lines(schema, value, path, depth)
+        if type_names == ["object"]:
+            lines.extend(object_lines)
+        elif object_lines:
+            # other types are allowed too, and have no properties
+            lines.append("if type(" + value + ") is dict:")
+            lines.extend("    " + line for line in object_lines)
+
+    items_schema = schema.get("items")
+    if isinstance(items_schema, dict):
+        item = "item" + str(depth)
+        index = "index" + str(depth)
+        item_lines = make_validation_lines(
+            items_schema, item, path + ' + "[" + str(' + index + ') + "]"', depth + 1
+        )
+        if item_lines:
+            loop = "for " + index + ", " + item + " in enumerate(" + value + "):"
+            if type_names == ["array"]:
+                lines.append(loop)
+                lines.extend("    " + line for line in item_lines)
+            else:
+                lines.append("if type(" + value + ") is list:")
+                lines.append("    " + loop)
+                lines.extend("        " + line for line in item_lines)
+    return lines
+
+
+def _make_object_validation_lines(schema, value, path, depth):
+    lines = []
+    property_schemas = schema.get("properties") or {}
+    required_property_names = set(schema.get("required") or ())
+    property_value = "value" + str(depth)
+    for schema_property_name in sorted(property_schemas.keys() | required_property_names):
+        key = json.dumps(schema_property_name)
+        if schema_property_name.isidentifier():
+            path_suffix = json.dumps("." + schema_property_name)
+        else:
+            path_suffix = json.dumps("[" + key + "]")
+        property_lines = make_validation_lines(
+            property_schemas.get(schema_property_name) or {}, property_value, path + " + " + path_suffix, depth + 1
+        )
+        required = schema_property_name in required_property_names
+        if required and not property_lines:
+            lines.append("if " + key + " not in " + value + ":")
+            lines.append("    raise ValidationError(" + path + ", " + json.dumps("missing required property " + key) + ")")
+        elif required:
+            lines.append("try:")
+            lines.append("    " + property_value + " = " + value + "[" + key + "]")
+            lines.append("except KeyError:")
+            lines.append(
+                "    raise ValidationError(" + path + ", " + json.dumps("missing required property " + key) + ") from None"
+            )
+            lines.extend(property_lines)
+        elif property_lines:
+            lines.append(property_value + " = " + value + ".get(" + key + ", MISSING)")
+            lines.append("if " + property_value + " is not MISSING:")
+            lines.extend("    " + line for line in property_lines)
+    return lines
+
+
 def create_directory(directory, force):
+    # with force, an existing directory is kept: the generated files are
+    # rewritten only if they changed (write_file_if_changed), and stale ones
+    # are removed afterwards (remove_stale_files), so that a no-op run leaves
+    # the files, their mtimes and __pycache__ untouched
     if os.path.exists(directory):
-        if force:
-            shutil.rmtree(directory, ignore_errors=True)
-        else:
+        if not force:
             exit_with_error("output directory {} already exists", directory)
+        return
 
     os.makedirs(directory)
 
 
+def write_file_if_changed(file_path, text):
+    # returns whether the file was written; a changed file is replaced
+    # atomically, so readers never see it half written
+    try:
+        with open(file_path) as file_obj:
+            if file_obj.read() == text:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+
+    temp_file_path = os.fspath(file_path) + ".tmp"
+    with open(temp_file_path, "w") as file_obj:
+        file_obj.write(text)
+    os.replace(temp_file_path, file_path)
+    return True
+
+
+def remove_stale_files(directory, file_names):
+    # removes the Python files in directory that are not in file_names, and
+    # returns their names
+    stale_file_names = []
+    for file_name in sorted(os.listdir(directory)):
+        if file_name.endswith(".py") and file_name not in file_names:
+            os.remove(os.path.join(directory, file_name))
+            stale_file_names.append(file_name)
+    return stale_file_names
+
+
 def to_underscore_separated_name(name):
     result = ""
     first_char = True
@@ -83,6 +418,11 @@ def class_name_to_private_module_name(class_name):
     return "_" + to_underscore_separated_name(class_name)
 
 
+def read_json_file(path):
+    with open(path, mode="rb") as file_obj:
+        return json_backend.loads(file_obj.read())
+
+
 def unpickle_file(path):
     with open(path, mode="rt") as file_obj:
         contents = file_obj.read()
@@ -135,9 +475,11 @@ def make_frequency_table(schema_object, frequency_table=None):
 
     return frequency_table
 
+_INVALID_NAME_CHARACTERS = re.compile(r'[^a-zA-Z0-9_]')
+
 def ensure_valid_class_or_attribute_name(name):
     # Replace characters that are not allowed in Python identifiers with underscores
-    fixed_name = re.sub(r'[^a-zA-Z0-9_]', '_', name)
+    fixed_name = _INVALID_NAME_CHARACTERS.sub('_', name)
     
     # Ensure the name starts with a letter or underscore
     if not fixed_name[0].isalpha() and fixed_name[0] != '_':
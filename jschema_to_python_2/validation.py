@@ -0,0 +1,90 @@
+import gzip
+import os
+
+from jschema_to_python_2 import json_backend
+
+# the value of a missing optional property, in the generated validate methods
+MISSING = object()
+
+
+class ValidationError(ValueError):
+    """Raised by the validate methods of the classes generated with --validators.
+
+    path locates the invalid value in the document, e.g. "$.Jobs.Robot.Id" or
+    "$.RobotIds[2]", and message says what is wrong with it.
+    """
+
+    def __init__(self, path, message):
+        super(ValidationError, self).__init__(path + ": " + message)
+        self.path = path
+        self.message = message
+
+
+_JSON_TYPE_NAMES = {
+    type(None): "null",
+    bool: "boolean",
+    int: "integer",
+    float: "number",
+    str: "string",
+    list: "array",
+    dict: "object",
+}
+
+
+def json_type_name(value):
+    # for the messages of the generated validate methods
+    return _JSON_TYPE_NAMES.get(type(value), type(value).__name__)
+
+
+def validate_records(validate, records):
+    """Validates many parsed documents.
+
+    :param validate: the validate method of a generated class.
+    :param records: an iterable of parsed documents.
+
+    Returns a list of (index, ValidationError) pairs for the invalid records,
+    which is empty if they are all valid.
+    """
+
+    errors = []
+    for index, record in enumerate(records):
+        try:
+            validate(record)
+        except ValidationError as error:
+            errors.append((index, error))
+    return errors
+
+
+def validate_jsonl(validate, source):
+    """Validates each line of a line-delimited JSON stream.
+
+    :param validate: the validate method of a generated class.
+    :param source: the path of a .jsonl file (gzipped if it ends with .gz),
+        or an iterable of lines, such as an open file.
+
+    Returns a list of (line number, ValidationError) pairs for the invalid
+    lines, numbered from 1. Blank lines are skipped, and lines that are not
+    JSON are reported with the path "$".
+    """
+
+    if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__"):
+        path = os.fspath(source)
+        opener = gzip.open if path.endswith(b".gz" if isinstance(path, bytes) else ".gz") else open
+        with opener(source, "rb") as file_obj:
+            return validate_jsonl(validate, file_obj)
+
+    errors = []
+    for line_number, line in enumerate(source, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json_backend.loads(line)
+        except ValueError as error:
+            errors.append((line_number, ValidationError("$", "invalid JSON: " + str(error))))
+            continue
+        try:
+            validate(record)
+        except ValidationError as error:
+            errors.append((line_number, error))
+    return errors
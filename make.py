@@ -3,9 +3,21 @@
 
 import os
 import sys
+import copy
 import json
+import gzip
+import hashlib
+import random
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from genson import SchemaBuilder
+from genson.schema.strategies import BASIC_SCHEMA_STRATEGIES, List, Number, Object, String, Tuple, Typeless
+from jschema_to_python_2 import json_backend, json_stream
 from jschema_to_python_2.object_model_module_generator import ObjectModelModuleGenerator
+from jschema_to_python_2.profiler import PhaseProfiler
+from jschema_to_python_2.utilities import capitalize_first_letter, write_file_if_changed
 import subprocess
 from pathlib import Path
 import re
@@ -16,8 +28,44 @@ SCRIPT_DIR = Path(__file__).parent
 INPUT_DIR = SCRIPT_DIR / 'input'
 OUTPUT_DIR = SCRIPT_DIR / 'output'
 
-# key = class name, value = schema
-sub_definitions = {}
+# file name patterns read from the input directory
+# *.json files hold a single document (or an array of them, see read_json_file), the others hold
+# one document per line
+INPUT_PATTERNS = ('*.json', '*.jsonl', '*.ndjson', '*.jsonl.gz', '*.ndjson.gz')
+LINE_DELIMITED_SUFFIXES = ('.jsonl', '.ndjson')
+
+# how often (in records) to log the read rate in verbose mode
+PROGRESS_INTERVAL = 100000
+
+# number of file chunks handed to each worker process with --jobs, more chunks balance the load better
+CHUNKS_PER_JOB = 4
+
+# a string property is only marked as an enum by --detect-enums if it was seen at least this many
+# times per distinct value
+ENUM_MIN_OBSERVATIONS = 10
+
+CONTAINER_TYPES = (dict, list)
+# the values add_string_values() looks into
+STRING_VALUE_CONTAINERS = (str, dict, list)
+
+# bump when the layout of the --incremental cache file changes
+INFERENCE_CACHE_VERSION = 2
+
+# seed for --sample-size, so sampled runs are reproducible
+SAMPLE_SEED = 0
+
+# seconds between two polls of the input directory with --watch
+WATCH_INTERVAL = 0.1
+
+# phase timings and counters (files read or skipped, bytes parsed, ...); replaced by an
+# enabled profiler with --profile
+PROFILER = PhaseProfiler()
+
+# dot-separated object keys leading to the records in *.json files, set by --json-path
+JSON_PATH = None
+
+# the most distinct values of a string property marked as an enum, set by --detect-enums
+ENUM_MAX_VALUES = None
 
 def sanitize_input(input_str):
     # Replace invalid characters with underscores
@@ -37,52 +85,1092 @@ def ensure_proper_py_names(input_str):
     return input_str
 
 
-def collect_and_reorder_inner_objects(schema):
+def find_input_files(input_dir):
+    files = []
+    for pattern in INPUT_PATTERNS:
+        for file in input_dir.glob(pattern):
+            if file.name.endswith('-schema.json'):
+                continue
+            files.append(file)
+    return files
+
+
+def is_line_delimited(file):
+    name = file.name
+    if name.endswith('.gz'):
+        name = name[:-3]
+    return name.endswith(LINE_DELIMITED_SUFFIXES)
+
+
+def set_inference_options(json_path, enum_max_values):
+    # also the initializer of worker processes, which don't inherit them when they are spawned
+    global JSON_PATH, ENUM_MAX_VALUES
+    JSON_PATH = json_path
+    ENUM_MAX_VALUES = enum_max_values
+
+
+def starts_with_array(file):
+    with open(file, 'rb') as f:
+        return f.read(4096).lstrip()[:1] == b'['
+
+
+# A top-level array, or the value at --json-path, is streamed a record at a time instead of being
+# loaded whole, so a single huge document is read in bounded memory.
+def read_json_file(file):
+    if JSON_PATH or starts_with_array(file):
+        yield from read_streamed_json_file(file)
+        return
+
+    with open(file, 'rb') as f:
+        data = f.read()
+        PROFILER.count('bytes_parsed', len(data))
+        try:
+            j = json_backend.loads(data)
+        except ValueError:
+            # invalid JSON or invalid UTF-8 (JSONDecodeError and UnicodeDecodeError)
+            print(f'Error reading {file.name}. Skipping.')
+            PROFILER.count('files_skipped')
+            return
+
+    if not isinstance(j, dict):
+        print(f'Error reading {file.name}. Skipping.')
+        PROFILER.count('files_skipped')
+        return
+
+    PROFILER.count('files_read')
+    yield j
+
+
+def read_streamed_json_file(file):
+    def skip_invalid(index, error):
+        print(f'Error reading {file.name} record {index}. Skipping.')
+        PROFILER.count('records_skipped')
+
+    PROFILER.count('files_read')
+    PROFILER.count('bytes_parsed', file.stat().st_size)
+    try:
+        for index, j in json_stream.iter_json_values(file, JSON_PATH, skip_invalid):
+            if not isinstance(j, dict):
+                print(f'Error reading {file.name} record {index}. Skipping.')
+                PROFILER.count('records_skipped')
+                continue
+            yield j
+    except json_stream.JSONStreamError as error:
+        print(f'Error reading {file.name}: {error}. Skipping the rest of the file.')
+        PROFILER.count('files_skipped')
+
+
+def read_line_delimited_file(file):
+    # read one record at a time so memory stays flat regardless of file size
+    opener = gzip.open if file.name.endswith('.gz') else open
+    PROFILER.count('files_read')
+    bytes_parsed = 0
+    with opener(file, 'rb') as f:
+        try:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+
+                bytes_parsed += len(line)
+                try:
+                    j = json_backend.loads(line)
+                except ValueError:
+                    # invalid JSON or invalid UTF-8 (JSONDecodeError and UnicodeDecodeError)
+                    print(f'Error reading {file.name} line {line_number}. Skipping.')
+                    PROFILER.count('records_skipped')
+                    continue
+
+                if not isinstance(j, dict):
+                    print(f'Error reading {file.name} line {line_number}. Skipping.')
+                    PROFILER.count('records_skipped')
+                    continue
+
+                yield j
+        finally:
+            # also when the reader is abandoned early, e.g. by --converge-after
+            PROFILER.count('bytes_parsed', bytes_parsed)
+
+
+def read_records(file):
+    if is_line_delimited(file):
+        return read_line_delimited_file(file)
+    return read_json_file(file)
+
+
+# Structural fingerprint of a document: its keys and value types, but not its values.
+# genson only records keys and types, so a document whose shape has been added before
+# can't change the schema and doesn't need to go through add_object() again.
+# Keys are kept in document order, which is cheaper than sorting them and only costs an
+# extra add_object() call when the same keys show up in a different order.
+def document_shape(obj):
+    if type(obj) is dict:
+        values = obj.values()
+        types = tuple(map(type, values))
+        if dict in types or list in types:
+            return (tuple(obj), types, tuple([document_shape(value) for value in values if type(value) in CONTAINER_TYPES]))
+        return (tuple(obj), types)
+
+    types = frozenset(map(type, obj))
+    if dict in types or list in types:
+        return (types, frozenset([document_shape(item) for item in obj if type(item) in CONTAINER_TYPES]))
+    return types
+
+
+def add_records(builder, input_files, logger, shape_counts=None, start_time=None):
+    records = 0
+    for file in input_files:
+        logger.info(f'Reading {file.name}...')
+        # with --profile, the time spent reading and parsing is reported separately
+        for j in PROFILER.iterate('read_json', read_records(file)):
+            shape = None
+            if shape_counts is not None:
+                shape = document_shape(j)
+                if shape in shape_counts:
+                    shape_counts[shape] += 1
+                    shape = None
+                    if ENUM_MAX_VALUES:
+                        add_string_values(builder._root_node, j)
+
+            if shape is not None or shape_counts is None:
+                try:
+                    builder.add_object(j)
+                except TypeError:
+                    print(f'Error reading {file.name}. Skipping.')
+                    PROFILER.count('records_skipped')
+                    continue
+
+                if shape is not None:
+                    shape_counts[shape] = 1
+
+            records += 1
+            if start_time is not None and records % PROGRESS_INTERVAL == 0:
+                log_read_rate(logger, records, start_time)
+    PROFILER.count('records_read', records)
+    return records
+
+
+def build_partial_schema(input_files, use_shape_cache=True):
+    # runs in a worker process, returns the inferred state for its share of the input files,
+    # and the counters it added, which the parent process merges into its own
+    builder = make_schema_builder()
+    shape_counts = {} if use_shape_cache else None
+    counters = PROFILER.counters.copy()
+    records = add_records(builder, input_files, logging.getLogger('make'), shape_counts)
+    return export_schema_node(builder._root_node), records, shape_counts, PROFILER.counters - counters
+
+
+# genson strategy for strings that also collects the distinct values of each property, with
+# --detect-enums. A property with at most ENUM_MAX_VALUES of them, each seen ENUM_MIN_OBSERVATIONS
+# times on average, gets an "enum" of its values.
+class StringValues(String):
+    def __init__(self, node_class):
+        super().__init__(node_class)
+        # None once there are more than ENUM_MAX_VALUES
+        self._values = set()
+        self._count = 0
+
+    def add_object(self, obj):
+        super().add_object(obj)
+        self._count += 1
+        if self._values is not None:
+            self._values.add(obj)
+            if len(self._values) > ENUM_MAX_VALUES:
+                self._values = None
+
+    def merge_values(self, values, count):
+        self._count += count
+        if self._values is None or values is None:
+            self._values = None
+            return
+        self._values.update(values)
+        if len(self._values) > ENUM_MAX_VALUES:
+            self._values = None
+
+    def to_schema(self):
+        schema = super().to_schema()
+        if self._values and self._count >= ENUM_MIN_OBSERVATIONS * len(self._values):
+            schema['enum'] = sorted(self._values)
+        return schema
+
+
+# Adds the strings of a document whose shape was already added to the StringValues strategies, as
+# add_object() would have, without going through genson's strategy matching again.
+def add_string_values(node, obj):
+    obj_type = type(obj)
+    if obj_type is str:
+        for strategy in node._active_strategies:
+            if type(strategy) is StringValues:
+                strategy.add_object(obj)
+                return
+    elif obj_type is dict:
+        for strategy in node._active_strategies:
+            if type(strategy) is Object:
+                properties = strategy._properties
+                for key, value in obj.items():
+                    if type(value) in STRING_VALUE_CONTAINERS:
+                        add_string_values(properties[key], value)
+                return
+    elif obj_type is list:
+        for strategy in node._active_strategies:
+            if type(strategy) is List:
+                for item in obj:
+                    if type(item) in STRING_VALUE_CONTAINERS:
+                        add_string_values(strategy._items, item)
+                return
+
+
+class EnumDetectingSchemaBuilder(SchemaBuilder):
+    EXTRA_STRATEGIES = (StringValues,)
+
+
+def make_schema_builder():
+    return EnumDetectingSchemaBuilder() if ENUM_MAX_VALUES else SchemaBuilder()
+
+
+# genson strategy classes by name, used to rebuild exported builder state
+SCHEMA_STRATEGIES = {strategy.__name__: strategy for strategy in BASIC_SCHEMA_STRATEGIES + (Typeless, StringValues)}
+
+
+# genson's add_schema() goes through to_schema(), which drops empty "required" lists and
+# reorders empty objects/arrays in anyOf, so merging partial schemas that way does not match a
+# single process. Instead the builder's node tree is exported as plain data (genson's node
+# classes can't be pickled) and merged node by node, mirroring what add_object() would have
+# done had the same records been added in order.
+def export_schema_node(node):
+    exported = []
+    for strategy in node._active_strategies:
+        entry = {'strategy': type(strategy).__name__}
+        if isinstance(strategy, Object):
+            entry['properties'] = {prop: export_schema_node(subnode) for prop, subnode in strategy._properties.items()}
+            entry['patternProperties'] = {pattern: export_schema_node(subnode) for pattern, subnode in strategy._pattern_properties.items()}
+            entry['required'] = None if strategy._required is None else sorted(strategy._required)
+            entry['includeEmptyRequired'] = strategy._include_empty_required
+        elif isinstance(strategy, List):
+            entry['items'] = export_schema_node(strategy._items)
+        elif isinstance(strategy, Tuple):
+            entry['items'] = [export_schema_node(item) for item in strategy._items]
+        elif isinstance(strategy, Number):
+            entry['type'] = strategy._type
+        elif isinstance(strategy, StringValues):
+            entry['values'] = None if strategy._values is None else sorted(strategy._values)
+            entry['count'] = strategy._count
+        if strategy._extra_keywords:
+            entry['extra'] = dict(strategy._extra_keywords)
+        exported.append(entry)
+    return exported
+
+
+def merge_schema_node(target, exported):
+    for entry in exported:
+        strategy_class = SCHEMA_STRATEGIES[entry['strategy']]
+        target_strategy = None
+        for strategy in target._active_strategies:
+            if type(strategy) is strategy_class:
+                target_strategy = strategy
+                break
+
+        if target_strategy is None:
+            target_strategy = strategy_class(target.__class__)
+            target._active_strategies.append(target_strategy)
+
+        if strategy_class is Object:
+            for prop, subnode in entry['properties'].items():
+                merge_schema_node(target_strategy._properties[prop], subnode)
+            for pattern, subnode in entry['patternProperties'].items():
+                merge_schema_node(target_strategy._pattern_properties[pattern], subnode)
+            if entry['required'] is not None:
+                if target_strategy._required is None:
+                    target_strategy._required = set(entry['required'])
+                else:
+                    target_strategy._required &= set(entry['required'])
+            target_strategy._include_empty_required |= entry['includeEmptyRequired']
+        elif strategy_class is List:
+            merge_schema_node(target_strategy._items, entry['items'])
+        elif strategy_class is Tuple:
+            while len(target_strategy._items) < len(entry['items']):
+                target_strategy._items.append(target.__class__())
+            for target_item, item in zip(target_strategy._items, entry['items']):
+                merge_schema_node(target_item, item)
+        elif strategy_class is Number:
+            if entry['type'] == 'number':
+                target_strategy._type = 'number'
+        elif strategy_class is StringValues:
+            target_strategy.merge_values(entry['values'], entry['count'])
+
+        for keyword, value in entry.get('extra', {}).items():
+            target_strategy._extra_keywords.setdefault(keyword, value)
+
+
+def split_into_chunks(items, chunk_count):
+    # contiguous chunks, so merging them in order sees the files in the same order as a single process
+    chunk_size, remainder = divmod(len(items), chunk_count)
+    chunks = []
+    start = 0
+    for i in range(chunk_count):
+        end = start + chunk_size + (1 if i < remainder else 0)
+        chunks.append(items[start:end])
+        start = end
+    return chunks
+
+
+def build_schema(input_files, logger, jobs=1, use_shape_cache=True):
+    builder = make_schema_builder()
+    shape_counts = {} if use_shape_cache else None
+    start_time = time.perf_counter()
+    if jobs > 1 and len(input_files) > 1:
+        chunks = split_into_chunks(input_files, min(len(input_files), jobs * CHUNKS_PER_JOB))
+        logger.info(f'Reading {len(input_files)} files in {len(chunks)} chunks across {jobs} processes...')
+        records = 0
+        with ProcessPoolExecutor(max_workers=jobs, initializer=set_inference_options,
+                                 initargs=(JSON_PATH, ENUM_MAX_VALUES)) as executor:
+            # map() yields results in submission order, keeping the merge deterministic
+            partials = executor.map(build_partial_schema, chunks, [use_shape_cache] * len(chunks))
+            for partial_node, partial_records, partial_shape_counts, partial_counters in partials:
+                merge_schema_node(builder._root_node, partial_node)
+                PROFILER.counters.update(partial_counters)
+                records += partial_records
+                if shape_counts is not None:
+                    for shape, count in partial_shape_counts.items():
+                        shape_counts[shape] = shape_counts.get(shape, 0) + count
+    else:
+        records = add_records(builder, input_files, logger, shape_counts, start_time)
+
+    log_read_rate(logger, records, start_time)
+    if shape_counts is not None:
+        log_shape_counts(logger, shape_counts, records)
+    return builder.to_schema()
+
+
+def build_file_nodes(input_files, use_shape_cache=True):
+    # runs in a worker process with --incremental, returns the inferred state of each file separately
+    results = []
+    for file in input_files:
+        node, records, _, counters = build_partial_schema([file], use_shape_cache)
+        results.append((node, records, counters))
+    return results
+
+
+def infer_file_nodes(input_files, jobs=1, use_shape_cache=True):
+    if jobs > 1 and len(input_files) > 1:
+        chunks = split_into_chunks(input_files, min(len(input_files), jobs * CHUNKS_PER_JOB))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=set_inference_options,
+                                 initargs=(JSON_PATH, ENUM_MAX_VALUES)) as executor:
+            results = []
+            for chunk_results in executor.map(build_file_nodes, chunks, [use_shape_cache] * len(chunks)):
+                for node, records, counters in chunk_results:
+                    PROFILER.counters.update(counters)
+                    results.append((node, records, counters))
+            return results
+    return build_file_nodes(input_files, use_shape_cache)
+
+
+def hash_file(file):
+    digest = hashlib.sha256()
+    with open(file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def make_empty_inference_cache():
+    return {'version': INFERENCE_CACHE_VERSION, 'json_path': JSON_PATH, 'enum_max_values': ENUM_MAX_VALUES,
+            'files': {}, 'nodes': {}, 'merged': {}}
+
+
+def load_inference_cache(cache_file):
+    empty_cache = make_empty_inference_cache()
+    try:
+        with open(cache_file, 'rb') as f:
+            cache = json_backend.loads(f.read())
+    except (OSError, ValueError):
+        return empty_cache
+
+    if not isinstance(cache, dict) or cache.get('version') != INFERENCE_CACHE_VERSION:
+        return empty_cache
+    # the records of the files depend on --json-path, and their inferred state on --detect-enums
+    if cache.get('json_path') != JSON_PATH or cache.get('enum_max_values') != ENUM_MAX_VALUES:
+        return empty_cache
+    return cache
+
+
+def write_inference_cache(cache_file, cache):
+    # write to a temporary file first so an interrupted run can't leave a truncated cache behind
+    temp_file = cache_file.with_name(cache_file.name + '.tmp')
+    with open(temp_file, 'w') as f:
+        f.write(json_backend.dumps(cache))
+    os.replace(temp_file, cache_file)
+
+
+# The cache maps each input file (relative to the input directory) to its size, mtime and
+# content hash, plus the exported builder state inferred from it. Identical per-file states are
+# stored once in "nodes". Files are only hashed when their size or mtime changed, and only parsed
+# when their content did; the merged schema is reused as long as the ordered per-file states match.
+# Without a cache_file, the cache starts empty and is only kept in memory (for --watch).
+def build_inference_cache(input_files, input_dir, cache_file, logger, jobs=1, use_shape_cache=True):
+    cache = load_inference_cache(cache_file) if cache_file else make_empty_inference_cache()
+    new_cache, changed_files, removed_files = update_inference_cache(cache, input_files, input_dir, logger, jobs, use_shape_cache)
+    logger.info(f'{changed_files} of {len(input_files)} files changed, {removed_files} removed since the last run')
+    if cache_file and new_cache is not cache:
+        write_inference_cache(cache_file, new_cache)
+    return new_cache
+
+
+# Brings an inference cache (see build_inference_cache) up to date with the input files.
+# Returns the cache, which is a new one only if anything changed, and the numbers of changed and
+# removed files.
+def update_inference_cache(cache, input_files, input_dir, logger, jobs=1, use_shape_cache=True):
+    cached_files = cache['files']
+    nodes = cache['nodes']
+
+    files = {}
+    changed_files = []
+    for file in input_files:
+        key = file.relative_to(input_dir).as_posix()
+        stat = file.stat()
+        entry = cached_files.get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            files[key] = entry
+            continue
+
+        sha256 = hash_file(file)
+        if entry and entry['sha256'] == sha256:
+            files[key] = dict(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            continue
+
+        files[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+        changed_files.append((key, file))
+
+    removed_files = len(cached_files.keys() - files.keys())
+
+    start_time = time.perf_counter()
+    results = infer_file_nodes([file for _, file in changed_files], jobs, use_shape_cache)
+    records = 0
+    for (key, _), (node, file_records, _) in zip(changed_files, results):
+        node_key = hash_text(json.dumps(node))
+        nodes.setdefault(node_key, node)
+        files[key]['node'] = node_key
+        files[key]['records'] = file_records
+        records += file_records
+    if changed_files:
+        log_read_rate(logger, records, start_time)
+
+    merged_key = hash_text('\n'.join(entry['node'] for entry in files.values()))
+    merged = cache['merged']
+    if merged.get('key') != merged_key:
+        builder = make_schema_builder()
+        for entry in files.values():
+            merge_schema_node(builder._root_node, nodes[entry['node']])
+        merged = {'key': merged_key, 'schema': builder.to_schema()}
+
+    if files != cached_files or merged is not cache['merged']:
+        used_nodes = {entry['node'] for entry in files.values()}
+        cache = {
+            'version': INFERENCE_CACHE_VERSION,
+            'json_path': JSON_PATH,
+            'enum_max_values': ENUM_MAX_VALUES,
+            'files': files,
+            'nodes': {node_key: node for node_key, node in nodes.items() if node_key in used_nodes},
+            'merged': merged,
+        }
+    return cache, len(changed_files), removed_files
+
+
+def log_shape_counts(logger, shape_counts, records):
+    if not shape_counts:
+        return
+    most_common = max(shape_counts.values())
+    logger.info(f'Found {len(shape_counts)} distinct document shapes in {records} records '
+                f'(most common shape: {most_common} records, {100 * most_common / records:.1f}%)')
+
+
+def iter_input_records(input_files, logger):
+    for file in input_files:
+        logger.info(f'Reading {file.name}...')
+        yield from read_records(file)
+
+
+# Algorithm R: a uniform sample of `size` records from a stream of unknown length
+def reservoir_sample(records, size, rng):
+    sample = []
+    seen = 0
+    for j in records:
+        if seen < size:
+            sample.append(j)
+        else:
+            k = rng.randrange(seen + 1)
+            if k < size:
+                sample[k] = j
+        seen += 1
+    return sample, seen
+
+
+# a reservoir per input file, so small files are represented as well as large ones. The size is
+# shared equally between the files, read from the smallest up, and the share a file is too small
+# to use goes to the larger ones, so the sample has at most size records. They are returned in the
+# order of input_files.
+def stratified_sample(input_files, size, rng):
+    file_samples = {}
+    seen = 0
+    remaining = size
+    files_by_size = sorted(input_files, key=lambda file: file.stat().st_size)
+    for index, file in enumerate(files_by_size):
+        quota = remaining // (len(files_by_size) - index)
+        file_sample, file_seen = reservoir_sample(read_records(file), quota, rng)
+        file_samples[file] = file_sample
+        remaining -= len(file_sample)
+        seen += file_seen
+    sample = []
+    for file in input_files:
+        sample.extend(file_samples[file])
+    return sample, seen
+
+
+def build_sampled_schema(input_files, logger, sample_size=None, sample_strategy='reservoir', converge_after=None):
+    start_time = time.perf_counter()
+    scanned = None
+    if sample_size:
+        rng = random.Random(SAMPLE_SEED)
+        logger.info(f'Sampling {sample_size} records ({sample_strategy})...')
+        if sample_strategy == 'stratified':
+            records, scanned = stratified_sample(input_files, sample_size, rng)
+        else:
+            records, scanned = reservoir_sample(iter_input_records(input_files, logger), sample_size, rng)
+    else:
+        records = iter_input_records(input_files, logger)
+
+    builder = SchemaBuilder()
+    shape_counts = {}
+    schema = builder.to_schema()
+    inferred = 0
+    # number of consecutive records that left the schema unchanged
+    unchanged_run = 0
+    schema_changes = 0
+    last_change = 0
+    converged = False
+    for j in records:
+        shape = document_shape(j)
+        if shape in shape_counts:
+            shape_counts[shape] += 1
+            inferred += 1
+            unchanged_run += 1
+        else:
+            try:
+                builder.add_object(j)
+            except TypeError:
+                print('Error reading record. Skipping.')
+                continue
+
+            shape_counts[shape] = 1
+            inferred += 1
+            # a new shape doesn't necessarily change the schema, e.g. a subset of known keys
+            new_schema = builder.to_schema()
+            if new_schema != schema:
+                schema = new_schema
+                schema_changes += 1
+                last_change = inferred
+                unchanged_run = 0
+            else:
+                unchanged_run += 1
+
+        if converge_after and unchanged_run >= converge_after:
+            converged = True
+            break
+
+    log_read_rate(logger, inferred, start_time)
+    print_inference_report({
+        'records_scanned': inferred if scanned is None else scanned,
+        'records_inferred': inferred,
+        'distinct_shapes': len(shape_counts),
+        'shapes_seen_once': sum(1 for count in shape_counts.values() if count == 1),
+        'schema_changes': schema_changes,
+        'last_change_at_record': last_change,
+        'unchanged_run': unchanged_run,
+        'converged': converged,
+    })
+    return schema
+
+
+def print_inference_report(report):
+    print(f"Inferred the schema from {report['records_inferred']} of {report['records_scanned']} records scanned.")
+    if report['converged']:
+        print(f"Stopped early: the last {report['unchanged_run']} records did not change the schema.")
+    print(f"Distinct document shapes: {report['distinct_shapes']}, "
+          f"schema changes: {report['schema_changes']} (last at record {report['last_change_at_record']}).")
+
+    if report['records_inferred']:
+        # Good-Turing estimate of the chance that the next record has a shape not seen so far
+        missing_mass = report['shapes_seen_once'] / report['records_inferred']
+        print(f"Estimated probability that an unseen record has a new shape: {missing_mass:.4%}")
+    if report['unchanged_run']:
+        # rule of three: 95% upper bound on the per-record chance of a schema change,
+        # given the number of consecutive records that changed nothing
+        upper_bound = min(1.0, 3 / report['unchanged_run'])
+        print(f"95% confidence that fewer than {upper_bound:.4%} of records would change the schema.")
+
+
+def log_read_rate(logger, records, start_time):
+    elapsed = time.perf_counter() - start_time
+    rate = records / elapsed if elapsed > 0 else 0
+    logger.info(f'Read {records} records in {elapsed:.2f}s ({rate:.0f} records/sec)')
+
+
+def collect_and_reorder_inner_objects(schema, index, path=()):
     if not isinstance(schema, dict):
         return schema
     
-    objects_to_reorder = []
+    objects_to_reorder = {}
 
     # if we were passed an object
     if schema.get('properties') is not None:
         for key, value in schema.get('properties', {}).items():
             if value.get('type') == 'object':
-                schema['properties'][key] = collect_and_reorder_inner_objects(value)
-                sub_definitions[key] = value
-                objects_to_reorder.append(key)
+                schema['properties'][key] = collect_and_reorder_inner_objects(value, index, path + (key,))
+                objects_to_reorder[key] = add_inner_definition(index, key, value, path)
             elif value.get('type') == 'array':
-                schema['properties'][key] = collect_and_reorder_inner_objects(value)
+                schema['properties'][key] = collect_and_reorder_inner_objects(value, index, path + (key,))
 
-        for key in objects_to_reorder:
-            schema['properties'][key] = {'$ref': f'#/$defs/{key}'}
+        for key, name in objects_to_reorder.items():
+            schema['properties'][key] = {'$ref': f'#/$defs/{name}'}
 
     # if we were passed an array
     elif schema.get('items') is not None:
         for key, value in schema.get('items', {}).items():
             # check if value is a dict
             if isinstance(value, dict) and value.get('type') == 'object':
-                schema['items'][key] = collect_and_reorder_inner_objects(value)
-                sub_definitions[key] = value
-                objects_to_reorder.append(key)
+                schema['items'][key] = collect_and_reorder_inner_objects(value, index, path + (key,))
+                objects_to_reorder[key] = add_inner_definition(index, key, value, path)
 
-        for key in objects_to_reorder:
-            schema['items'][key] = {'$ref': f'#/$defs/{key}'}
+        for key, name in objects_to_reorder.items():
+            schema['items'][key] = {'$ref': f'#/$defs/{name}'}
 
     return schema
 
-    
 
-# input json schema (dict), output json schema (dict) with definitions placed at the end
-def refactor_inner_classes(schema):
-    collect_and_reorder_inner_objects(schema)
+def canonical_schema_key(schema):
+    # the order of "required" doesn't matter to the generated class
+    def canonicalize(value):
+        if isinstance(value, dict):
+            return {
+                key: sorted(item) if key == 'required' and isinstance(item, list) else canonicalize(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [canonicalize(item) for item in value]
+        return value
+
+    return hash_text(json_backend.dumps_sorted(canonicalize(schema)))
+
+
+# Returns the name of the definition of an inner object found at path (the property names leading
+# to it) under the property key. Inner objects are hash-consed: one definition per distinct
+# structure, compared after their own inner objects were replaced by references, so identical
+# objects found under any names share a class. A structure whose key is already taken by another
+# one (or whose class name is) is named after its parent properties, "JobsRobot", or else
+# numbered, "Robot2".
+def add_inner_definition(index, key, schema, path):
+    index['inner_objects'] += 1
+    location = '/'.join(path + (key,))
+    structure_key = canonical_schema_key(schema)
+    name = index['structures'].get(structure_key)
+    if name is not None:
+        index['merged'].append((location, name))
+        return name
+
+    for name in inner_definition_names(key, path):
+        class_name = capitalize_first_letter(name)
+        if class_name not in index['class_names']:
+            break
+
+    index['structures'][structure_key] = name
+    index['class_names'].add(class_name)
+    index['definitions'][name] = schema
+    if name != key:
+        index['renamed'].append((location, name))
+    return name
+
+
+def inner_definition_names(key, path):
+    yield key
+    for start in range(len(path) - 1, -1, -1):
+        yield ''.join(capitalize_first_letter(part) for part in path[start:] + (key,))
+    number = 2
+    while True:
+        yield f'{key}{number}'
+        number += 1
+
+
+# input json schema (dict), output json schema (dict) with definitions placed at the end.
+# report, if given, is filled with the number of inner objects and definitions, and the
+# locations of the inner objects merged into an identical definition or renamed
+def refactor_inner_classes(schema, report=None):
+    index = {
+        'definitions': {},
+        'structures': {},
+        # the root class is generated too, so its name is taken
+        'class_names': {capitalize_first_letter(schema['title'])} if schema.get('title') else set(),
+        'inner_objects': 0,
+        'merged': [],
+        'renamed': [],
+    }
+    collect_and_reorder_inner_objects(schema, index)
     schema['$defs'] = {}
-    for key, value in sub_definitions.items():
+    for key, value in index['definitions'].items():
         schema['$defs'][key] = value
-    sub_definitions.clear()
+    if report is not None:
+        report.update({
+            'inner_objects': index['inner_objects'],
+            'definitions': len(index['definitions']),
+            'merged': index['merged'],
+            'renamed': index['renamed'],
+        })
     return schema
 
 
+def print_definition_report(report, logger):
+    if report['merged'] or report['renamed']:
+        print(f"{report['inner_objects']} inner objects became {report['definitions']} classes: "
+              f"{len(report['merged'])} merged into an identical class, {len(report['renamed'])} renamed "
+              f"to avoid a name collision.")
+    for location, name in report['merged']:
+        logger.info(f'{location} has the same structure as {name}')
+    for location, name in report['renamed']:
+        logger.info(f'{location} is generated as {name}, another structure has its name')
+
+
+# Polls the input directory until interrupted. Only changed input files are read again (see
+# update_inference_cache), and only the classes whose schema changed are rendered again (the
+# generator's render_cache); unchanged output files are left alone by the generator. Polling is used rather than
+# file system notifications, which need a platform-specific dependency.
+def watch(inference_cache, input_dir, cache_file, schema_file, generator_args, render_cache, logger,
+          interval=WATCH_INTERVAL, jobs=1, use_shape_cache=True):
+    with open(schema_file) as f:
+        schema_text = f.read()
+
+    print(f'Watching {input_dir} for changes, press Ctrl+C to stop.')
+    try:
+        while True:
+            time.sleep(interval)
+            start_time = time.perf_counter()
+            input_files = find_input_files(input_dir)
+            new_cache, changed_files, removed_files = update_inference_cache(
+                inference_cache, input_files, input_dir, logger, jobs, use_shape_cache
+            )
+            if new_cache is inference_cache:
+                continue
+            inference_cache = new_cache
+            if cache_file:
+                write_inference_cache(cache_file, inference_cache)
+            if not input_files:
+                logger.warning(f'No JSON files found in input directory: {input_dir}')
+                continue
+
+            schema = copy.deepcopy(inference_cache['merged']['schema'])
+            schema['title'] = generator_args.root_class_name
+            schema = refactor_inner_classes(schema)
+            text = json.dumps(schema, indent=2)
+            if text == schema_text:
+                logger.info(f'{changed_files} files changed, {removed_files} removed; the schema is unchanged')
+                continue
+            write_file_if_changed(schema_file, text)
+            schema_text = text
+
+            generator = ObjectModelModuleGenerator(generator_args, root_schema=schema, render_cache=render_cache)
+            written_files = generator.generate()
+            elapsed = (time.perf_counter() - start_time) * 1000
+            class_names = ', '.join(generator.rendered_class_names) or 'none'
+            print(f'{changed_files} files changed, {removed_files} removed: regenerated {class_names}, '
+                  f'wrote {len(written_files)} files in {elapsed:.0f} ms')
+    except KeyboardInterrupt:
+        print('Stopped watching.')
+
+
+# options a --manifest entry may set, by their command line names with dashes replaced by underscores
+MANIFEST_OPTIONS = (
+    'input_dir', 'output_dir', 'root_class_name', 'module_name', 'no_shape_cache', 'sample_size',
+    'sample_strategy', 'converge_after', 'incremental', 'slots', 'frozen', 'batch_classes', 'lazy',
+    'validators', 'split_modules', 'json_path', 'detect_enums', 'enum_converters',
+)
+MANIFEST_REQUIRED_OPTIONS = ('root_class_name', 'module_name')
+
+
+# Reads a manifest: a JSON list of models, or an object with a "models" list and "defaults" shared by
+# all of them. Each model is an object of MANIFEST_OPTIONS; the others default to those of the
+# command line (defaults), and relative paths are relative to the manifest. Returns the options of
+# each model, or raises ValueError if the manifest is invalid.
+def load_manifest(manifest_file, defaults):
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {'models': manifest}
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('models'), list):
+        raise ValueError(f'{manifest_file} must be a list of models, or an object with a "models" list')
+
+    shared_options = manifest.get('defaults', {})
+    models = []
+    for index, entry in enumerate(manifest['models']):
+        options = {name: defaults[name] for name in MANIFEST_OPTIONS}
+        for name, value in list(shared_options.items()) + list(entry.items()):
+            name = name.replace('-', '_')
+            if name not in MANIFEST_OPTIONS:
+                raise ValueError(f'Unknown option "{name}" for model {index} in {manifest_file}')
+            options[name] = value
+        for name in MANIFEST_REQUIRED_OPTIONS:
+            if not options[name]:
+                raise ValueError(f'Model {index} in {manifest_file} has no {name}')
+        for name in ('input_dir', 'output_dir'):
+            options[name] = str(manifest_file.parent / options[name])
+        # models are built in parallel, not the files of one model
+        options.update(jobs=1, watch=False)
+        models.append(options)
+    return models
+
+
+# Builds one model of a manifest, usually in a worker process. Never raises, so that a failing model
+# doesn't stop the others: returns its name, whether it was built, the time it took, and the number
+# of classes and changed files, or the error.
+def build_manifest_model(options):
+    start_time = time.perf_counter()
+    logger = logging.getLogger('make')
+    name = manifest_model_name(options)
+    try:
+        input_dir = Path(options['input_dir'])
+        output_dir = Path(options['output_dir'])
+        if not input_dir.exists():
+            raise ValueError(f'Input directory does not exist: {input_dir}')
+        input_files = find_input_files(input_dir)
+        if not input_files:
+            raise ValueError(f'No JSON files found in input directory: {input_dir}')
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        root_class_name = sanitize_input(ensure_proper_py_names(options['root_class_name']))
+        module_name = sanitize_input(ensure_proper_py_names(options['module_name'])).lower()
+        model = build_model(input_files, input_dir, output_dir, root_class_name, module_name,
+                            argparse.Namespace(**options), logger)
+        return {
+            'name': name,
+            'ok': True,
+            'seconds': time.perf_counter() - start_time,
+            'classes': model['classes'],
+            'changed_files': len(model['changed_files']),
+        }
+    except (Exception, SystemExit) as error:
+        # SystemExit: the generator exits on some errors
+        return manifest_failure(name, time.perf_counter() - start_time, error)
+
+
+def manifest_model_name(options):
+    return f"{options['module_name']}.{options['root_class_name']}"
+
+
+def manifest_failure(name, seconds, error):
+    return {
+        'name': name,
+        'ok': False,
+        'seconds': seconds,
+        'error': f'{type(error).__name__}: {error}',
+        'traceback': ''.join(traceback.format_exception(type(error), error, error.__traceback__)),
+    }
+
+
+# Builds models of a manifest in a pool of jobs processes, passing each result to report. A worker
+# killed (e.g. by the OOM killer) or crashed breaks the whole pool, and every model that was not
+# finished yet fails with BrokenProcessPool: returns those models, with the error and the time they
+# were given.
+def build_manifest_pool(models, jobs, report):
+    start_time = time.perf_counter()
+    broken = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(build_manifest_model, options): options for options in models}
+        for future in as_completed(futures):
+            options = futures[future]
+            try:
+                result = future.result()
+            except BrokenProcessPool as error:
+                broken.append((options, error, time.perf_counter() - start_time))
+                continue
+            except Exception as error:
+                result = manifest_failure(manifest_model_name(options), time.perf_counter() - start_time, error)
+            report(result)
+    return broken
+
+
+# Builds every model of a manifest, jobs at a time, printing each one as it finishes and then a
+# summary. Returns the number of models that failed.
+def build_manifest(models, logger, jobs=1):
+    start_time = time.perf_counter()
+    results = []
+
+    def report(result):
+        results.append(result)
+        progress = f'[{len(results)}/{len(models)}] {result["name"]}:'
+        if result['ok']:
+            print(f"{progress} {result['classes']} classes, {result['changed_files']} files changed "
+                  f"in {result['seconds']:.2f}s")
+        else:
+            print(f"{progress} FAILED after {result['seconds']:.2f}s: {result['error']}")
+            logger.debug(result['traceback'])
+
+    if jobs > 1 and len(models) > 1:
+        broken = build_manifest_pool(models, jobs, report)
+        if broken:
+            # the worker that died took the others' models down with it: build them again one
+            # process each, so that only the model that kills its process fails
+            logger.warning(f'A worker process died; building the {len(broken)} unfinished models one at a time')
+        for options, _, _ in broken:
+            for options, error, seconds in build_manifest_pool([options], 1, report):
+                report(manifest_failure(manifest_model_name(options), seconds, error))
+    else:
+        for options in models:
+            report(build_manifest_model(options))
+
+    failed = [result['name'] for result in results if not result['ok']]
+    elapsed = time.perf_counter() - start_time
+    model_seconds = sum(result['seconds'] for result in results)
+    print(f'Built {len(models) - len(failed)} of {len(models)} models in {elapsed:.2f}s '
+          f'({model_seconds:.2f}s of model time across {jobs} processes).')
+    if failed:
+        print(f"Failed: {', '.join(failed)}")
+    slowest = sorted(results, key=lambda result: result['seconds'], reverse=True)[:5]
+    logger.info('Slowest models: ' + ', '.join(f"{result['name']} {result['seconds']:.2f}s" for result in slowest))
+    return len(failed)
+
+
+# genson puts a nullable string with an "enum" in an anyOf, which the generators don't look into:
+# turns {"anyOf": [{"type": "null"}, {"type": "string", "enum": [...]}]} into {"type": ["null",
+# "string"], "enum": [..., None]}. Returns the number of string schemas with an enum.
+def merge_nullable_enums(schema):
+    enums = 0
+    if isinstance(schema, list):
+        for item in schema:
+            enums += merge_nullable_enums(item)
+        return enums
+    if not isinstance(schema, dict):
+        return 0
+
+    any_of = schema.get('anyOf')
+    if isinstance(any_of, list) and len(any_of) == 2 and {'type': 'null'} in any_of:
+        other = any_of[1] if any_of[0] == {'type': 'null'} else any_of[0]
+        if other.keys() == {'type', 'enum'} and other['type'] == 'string':
+            del schema['anyOf']
+            schema['type'] = ['null', 'string']
+            schema['enum'] = other['enum'] + [None]
+            return 1
+    if schema.get('type') == 'string' and 'enum' in schema:
+        return 1
+    for value in schema.values():
+        enums += merge_nullable_enums(value)
+    return enums
+
+
+# Infers the schema of the input files and generates the object model module from it. options
+# holds the command line options (sampling, caching and code generation). Returns the schema file,
+# the generator's args, the inference cache (with --incremental or --watch), the number of classes
+# and the names of the module files that changed.
+def build_model(input_files, input_dir, output_dir, root_class_name, module_name, options, logger, render_cache=None):
+    inference_cache = None
+    cache_file = None
+    PY_DIR = output_dir / module_name
+    sampling = options.sample_size or options.converge_after
+    set_inference_options(options.json_path, None if sampling else options.detect_enums)
+
+    logger.info('Reading JSON files...')
+    with PROFILER.phase('inference'):
+        if sampling:
+            if options.jobs > 1:
+                logger.warning('--jobs is ignored when sampling or stopping early')
+            if options.incremental:
+                logger.warning('--incremental is ignored when sampling or stopping early')
+            if options.watch:
+                logger.warning('--watch is ignored when sampling or stopping early')
+            if options.detect_enums:
+                logger.warning('--detect-enums is ignored when sampling or stopping early')
+            JSON_SCHEMA = build_sampled_schema(input_files, logger, options.sample_size, options.sample_strategy, options.converge_after)
+        elif options.incremental or options.watch:
+            cache_file = output_dir / f'.{root_class_name.lower()}-inference-cache.json' if options.incremental else None
+            inference_cache = build_inference_cache(input_files, input_dir, cache_file, logger, max(1, options.jobs), not options.no_shape_cache)
+            # the schema is modified below, and the cached one is needed again by --watch
+            JSON_SCHEMA = copy.deepcopy(inference_cache['merged']['schema'])
+        else:
+            JSON_SCHEMA = build_schema(input_files, logger, max(1, options.jobs), not options.no_shape_cache)
+
+    if ENUM_MAX_VALUES:
+        enums = merge_nullable_enums(JSON_SCHEMA)
+        PROFILER.count('enums_detected', enums)
+        logger.info(f'Marked {enums} string properties with at most {ENUM_MAX_VALUES} distinct values as enums')
+
+    # No exception handling after here, because I want to crash if the schema is invalid.
+    JSON_SCHEMA['title'] = root_class_name
+    definition_report = {}
+    with PROFILER.phase('refactor_inner_classes'):
+        JSON_SCHEMA = refactor_inner_classes(JSON_SCHEMA, definition_report)
+    PROFILER.count('definitions_merged', len(definition_report['merged']))
+    PROFILER.count('definitions_renamed', len(definition_report['renamed']))
+    print_definition_report(definition_report, logger)
+
+    logger.info(f'Writing schema to {output_dir}')
+    schema_file = output_dir / f'{root_class_name.lower()}-schema.json'
+    with PROFILER.phase('write_schema'):
+        # left alone if unchanged, like the generated files, so tools watching it don't rebuild
+        write_file_if_changed(schema_file, json.dumps(JSON_SCHEMA, indent=2))
+
+    logger.info(f'Generating Python class to {PY_DIR}')
+    '''
+    subprocess.run([
+        sys.executable,
+        '-m',
+        'jschema_to_python',
+        '-s',
+        str(schema_file),
+        '-o',
+        str(PY_DIR),
+        '-r',
+        root_class_name,
+        '-m',
+        module_name,
+    ], check=True)
+    '''
+
+    # make an object resembling args for ObjectModelModuleGenerator to consume
+    class Args:
+        def __init__(self):
+            self.output_directory = str(PY_DIR)
+            self.force = True
+            self.module_name = module_name
+            self.schema_path = str(schema_file)
+            self.hints_file_path = None
+            self.root_class_name = root_class_name
+            self.slots = options.slots
+            self.frozen = options.frozen
+            self.batch_classes = options.batch_classes
+            self.lazy = options.lazy
+            self.validators = options.validators
+            self.split_modules = options.split_modules
+            self.enum_converters = options.enum_converters
+
+    # make an instance of Args
+    args = Args()
+
+    # make an instance of ObjectModelModuleGenerator
+    generator = ObjectModelModuleGenerator(args, profiler=PROFILER, render_cache=render_cache)
+    changed_files = generator.generate()
+
+    return {
+        'schema_file': schema_file,
+        'generator_args': args,
+        'inference_cache': inference_cache,
+        'cache_file': cache_file,
+        'classes': 1 + len(JSON_SCHEMA['$defs']),
+        'changed_files': changed_files,
+    }
+
+
 def main():
+    global PROFILER
     logging.basicConfig(level=logging.WARNING)
     logger = logging.getLogger('make')
 
@@ -91,14 +1179,54 @@ def main():
     parser.add_argument("--output-dir", help="Path to output directory", default="output/")
     parser.add_argument("--root-class-name", help="Name of root class / parent object")
     parser.add_argument("--module-name", help="Name of Python module")
+    parser.add_argument("-j", "--jobs", help="Number of processes used to infer the schema", type=int, default=1)
+    parser.add_argument("--no-shape-cache", help="Send every document to genson, even if its shape was already seen", action="store_true")
+    parser.add_argument("--sample-size", help="Infer the schema from a random sample of this many records", type=int)
+    parser.add_argument("--sample-strategy", help="How to draw the sample: one reservoir over all records, or one per input file", choices=['reservoir', 'stratified'], default='reservoir')
+    parser.add_argument("--converge-after", help="Stop once this many consecutive records do not change the schema", type=int)
+    parser.add_argument("--json-path", help="Read the records of *.json files from the array at this path of object keys, such as $.data.items, one at a time")
+    parser.add_argument("--detect-enums", help="Mark string properties with at most this many distinct values as enums in the schema", type=int, metavar="MAX_VALUES")
+    parser.add_argument("--incremental", help="Cache inferred schemas per input file in the output directory and only re-read changed files", action="store_true")
+    parser.add_argument("--watch", help="Keep running, and regenerate the schema and the changed classes when the input files change", action="store_true")
+    parser.add_argument("--watch-interval", help="Seconds between two polls of the input directory with --watch", type=float, default=WATCH_INTERVAL)
+    parser.add_argument("--slots", help="Generate slotted classes, which have no per-instance __dict__", action="store_true")
+    parser.add_argument("--frozen", help="Generate immutable classes that cache their hash", action="store_true")
+    parser.add_argument("--batch-classes", help="Also generate a columnar <ClassName>Batch container for each class", action="store_true")
+    parser.add_argument("--lazy", help="Generate classes that wrap the raw JSON and decode properties on first access", action="store_true")
+    parser.add_argument("--validators", help="Also generate validate methods that check parsed JSON against the schema of each class", action="store_true")
+    parser.add_argument("--split-modules", help="Generate one module per class, imported on first access from the package", action="store_true")
+    parser.add_argument("--enum-converters", help="Convert the values of enum properties when building objects: intern the strings, or map them to generated Enum classes", choices=['intern', 'enum'])
+    parser.add_argument("--profile", help="Write the time, CPU time and peak memory of each phase, and counters, to this JSON report", metavar="REPORT_PATH")
+    parser.add_argument("--profile-cprofile", help="With --profile, also dump cProfile statistics of the slowest phase to this file", metavar="STATS_PATH")
+    parser.add_argument("--manifest", help="Build every model listed in this JSON manifest, --jobs models at a time")
     parser.add_argument("-v", "--verbose", help="Increase output verbosity", action="store_true")
     args = parser.parse_args()
 
+    if args.profile_cprofile and not args.profile:
+        logger.error('--profile-cprofile requires --profile')
+        return
+    if args.profile:
+        PROFILER = PhaseProfiler(True, args.profile_cprofile)
+
     if args.verbose:
         # print as much as possible
         logger.setLevel(logging.DEBUG)
         logging.getLogger('genson').setLevel(logging.DEBUG)
         logging.getLogger('jschema_to_python').setLevel(logging.DEBUG)
+        logger.info(f'Using the {json_backend.BACKEND} JSON backend')
+
+    if args.manifest:
+        for option in ('watch', 'profile'):
+            if getattr(args, option):
+                logger.warning(f'--{option} is ignored with --manifest')
+        try:
+            models = load_manifest(Path(args.manifest), vars(args))
+        except (OSError, ValueError) as error:
+            logger.error(f'Cannot read the manifest: {error}')
+            return
+        if build_manifest(models, logger, max(1, args.jobs)):
+            sys.exit(1)
+        return
 
     if args.input_dir:
         INPUT_DIR = Path(args.input_dir)
@@ -114,7 +1242,9 @@ def main():
         logger.info(f'Creating output directory: {OUTPUT_DIR}')
         OUTPUT_DIR.mkdir()
     
-    if not any(INPUT_DIR.glob('*.json')):
+    with PROFILER.phase('discovery'):
+        input_files = find_input_files(INPUT_DIR)
+    if not input_files:
         logger.error(f'No JSON files found in input directory: {INPUT_DIR}')
         return
     
@@ -133,85 +1263,21 @@ def main():
     module_name = sanitize_input(module_name)
     module_name = module_name.lower()
 
-    PY_DIR = OUTPUT_DIR / module_name
-
-    if PY_DIR.exists():
-        logger.info(f'Deleting existing output directory: {PY_DIR}')
-        for file in PY_DIR.glob('*'):
-            os.remove(file)
-        os.rmdir(PY_DIR)
-
-    logger.info('Reading JSON files...')
-    builder = SchemaBuilder()
-    # for each json in INPUT_DIR that does not end with -schema.json
-    for file in INPUT_DIR.glob('*.json'):
-        logger.info(f'Checking {file.name}...')
-        if file.name.endswith('-schema.json'):
-            logger.info(f'Skipping {file.name}...')
-            continue
-
-        logger.info(f'Reading {file.name}...')
-        with open(file) as f:
-            j = None
-            try:
-                j = json.load(f)
-            except json.decoder.JSONDecodeError:
-                print(f'Error reading {file.name}. Skipping.')
-                continue
-
-            if not isinstance(j, dict):
-                print(f'Error reading {file.name}. Skipping.')
-                continue
-
-            try:
-                builder.add_object(j)
-            except TypeError:
-                print(f'Error reading {file.name}. Skipping.')
-                continue
-
-    # No exception handling after here, because I want to crash if the schema is invalid.
-    JSON_SCHEMA = builder.to_schema()
-    JSON_SCHEMA['title'] = root_class_name
-    JSON_SCHEMA = refactor_inner_classes(JSON_SCHEMA)
+    profile_path = args.profile
+    watching = args.watch and not (args.sample_size or args.converge_after)
 
-    logger.info(f'Writing schema to {OUTPUT_DIR}')
-    schema_file = OUTPUT_DIR / f'{root_class_name.lower()}-schema.json'
-    with open(schema_file, 'w') as f:
-        f.write(json.dumps(JSON_SCHEMA, indent=2))
-
-    logger.info(f'Generating Python class to {PY_DIR}')
-    '''
-    subprocess.run([
-        sys.executable,
-        '-m',
-        'jschema_to_python',
-        '-s',
-        str(schema_file),
-        '-o',
-        str(PY_DIR),
-        '-r',
-        root_class_name,
-        '-m',
-        module_name,
-    ], check=True)
-    '''
+    # keeps the source of each class for --watch, which only renders the changed ones again
+    render_cache = {} if watching else None
 
-    # make an object resembling args for ObjectModelModuleGenerator to consume
-    class Args:
-        def __init__(self):
-            self.output_directory = str(PY_DIR)
-            self.force = True
-            self.module_name = module_name
-            self.schema_path = str(schema_file)
-            self.hints_file_path = None
-            self.root_class_name = root_class_name
+    model = build_model(input_files, INPUT_DIR, OUTPUT_DIR, root_class_name, module_name, args, logger, render_cache)
 
-    # make an instance of Args
-    args = Args()
+    if profile_path:
+        PROFILER.write_report(profile_path)
+        logger.info(f'Profile written to {profile_path}')
 
-    # make an instance of ObjectModelModuleGenerator
-    generator = ObjectModelModuleGenerator(args)
-    generator.generate()
+    if watching:
+        watch(model['inference_cache'], INPUT_DIR, model['cache_file'], model['schema_file'], model['generator_args'],
+              render_cache, logger, args.watch_interval, max(1, args.jobs), not args.no_shape_cache)
 
     logger.info('Cleaning up...')
     print('Done.')